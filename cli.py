@@ -1,18 +1,28 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
+import io
+import subprocess
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
 
 from config import AppConfig, default_config
-from core import excel, notify, sla
-from core.logger import setup_logging
-from core.outlook import detect_outlook_environment
+from core.logger import get_logger, setup_logging
+
+# Subsystems (pandas via core.excel, pywin32 via core.outlook) are imported
+# inside each command so --help and light commands start fast.
 
 
 def cmd_ingest(args):
+    from core import sla
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     days = args.days or cfg.ingest_days
     if args.ignore_filter:
         cfg.sender_filter = ""
@@ -21,22 +31,28 @@ def cmd_ingest(args):
 
 
 def cmd_recalc(args):
+    from core import sla
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     updated = sla.recalc_open(cfg)
     logger.info("Recalc completed: %s tickets touched", updated)
 
 
 def cmd_export(args):
+    from core import excel
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     excel.export_excel(cfg, today_only=args.today_only)
     logger.info("Export finished")
 
 
 def cmd_send_overdue(args):
+    from core import notify, sla
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     sla.recalc_open(cfg)
     plan = sla.overdue_plan(cfg)
     logger.info(
@@ -60,8 +76,10 @@ def cmd_send_overdue(args):
 
 
 def cmd_diagnose(args):
+    from core.outlook import OutlookClient, detect_outlook_environment
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     env = detect_outlook_environment()
     logger.info(
         "Outlook environment: classic=%s, new_outlook=%s, details=%s",
@@ -69,8 +87,6 @@ def cmd_diagnose(args):
         env.new_outlook_detected,
         env.details,
     )
-    from core.outlook import OutlookClient
-
     with OutlookClient(cfg) as outlook:
         before, after, top10 = outlook.diagnose(args.days or cfg.ingest_days)
     print("Data dir:", cfg.paths.appdata_dir)
@@ -102,92 +118,112 @@ def cmd_diagnose(args):
 
 
 def cmd_process_responses(args):
+    from core import sla
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     updated = sla.process_responses(cfg, days=args.days or cfg.ingest_days)
     logger.info("Processed mail responses: %s", updated)
     print(f"Updated statuses from mail responses: {updated}")
 
 
+QA_TAIL_LINES = 40
+
+
+def _run_tail(cmd: list[str], max_lines: int = QA_TAIL_LINES) -> tuple[int, str]:
+    """Run cmd streaming stdout+stderr, keeping only the last max_lines."""
+    tail: deque[str] = deque(maxlen=max_lines)
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+    ) as proc:
+        for line in proc.stdout:
+            tail.append(line)
+        returncode = proc.wait()
+    return returncode, "".join(tail)[-2000:]
+
+
 def cmd_qa_full(args):
+    from core.outlook import detect_outlook_environment
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
-    report_lines = []
+    logger = get_logger()
+    report = io.StringIO()
     env = detect_outlook_environment()
-    report_lines.append(f"# QA Report {datetime.now().isoformat()}")
-    report_lines.append(f"- Python: {sys.version}")
-    report_lines.append(
-        f"- Outlook: classic_available={env.classic_available}, new_outlook={env.new_outlook_detected}, details={env.details}"
+    report.write(f"# QA Report {datetime.now().isoformat()}\n")
+    report.write(f"- Python: {sys.version}\n")
+    report.write(
+        f"- Outlook: classic_available={env.classic_available}, new_outlook={env.new_outlook_detected}, details={env.details}\n"
     )
-    report_lines.append(
-        f"- Config: safe_mode={cfg.safe_mode}, allow_send={cfg.allow_send}, mailbox={cfg.mailbox}, folder={cfg.folder}"
+    report.write(
+        f"- Config: safe_mode={cfg.safe_mode}, allow_send={cfg.allow_send}, mailbox={cfg.mailbox}, folder={cfg.folder}\n"
     )
-    # Step A: pytest
-    import subprocess
-
-    logger.info("Running pytest ...")
-    test_proc = subprocess.run(
-        [sys.executable, "-m", "pytest"], capture_output=True, text=True
-    )
-    report_lines.append("## Pytest")
-    report_lines.append(f"exit_code={test_proc.returncode}")
-    report_lines.append("```")
-    report_lines.append(test_proc.stdout[-2000:])
-    report_lines.append("```")
-    if test_proc.returncode != 0:
-        logger.error("Pytest failed; see QA_REPORT.md")
-    # Step B: semi-e2e driver (safe mode by default, send if requested)
-    logger.info("Running semi-e2e driver ...")
+    # Step A: pytest, Step B: semi-e2e driver (safe mode by default, send if
+    # requested). The two are independent, so they run concurrently unless
+    # --sequential is given.
+    pytest_cmd = [sys.executable, "-m", "pytest"]
+    if not getattr(args, "no_parallel", False) and importlib.util.find_spec("xdist"):
+        # loadfile keeps each test module on one worker (shared temp fixtures).
+        pytest_cmd += ["-n", "auto", "--dist=loadfile"]
     driver_cmd = [sys.executable, "qa/tools/qa_e2e_driver.py"]
     if args.send:
         driver_cmd.append("--send")
     if getattr(args, "no_wait", False):
         driver_cmd.append("--no-wait")
-    driver_proc = subprocess.run(driver_cmd, capture_output=True, text=True)
-    report_lines.append("## Semi E2E (qa_e2e_driver)")
-    report_lines.append(f"exit_code={driver_proc.returncode}")
-    report_lines.append("```")
-    report_lines.append(driver_proc.stdout[-2000:])
-    report_lines.append("```")
-    if driver_proc.returncode != 0:
+    logger.info("Running pytest and semi-e2e driver ...")
+    if getattr(args, "sequential", False):
+        test_rc, test_tail = _run_tail(pytest_cmd)
+        driver_rc, driver_tail = _run_tail(driver_cmd)
+    else:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            test_future = pool.submit(_run_tail, pytest_cmd)
+            driver_future = pool.submit(_run_tail, driver_cmd)
+            test_rc, test_tail = test_future.result()
+            driver_rc, driver_tail = driver_future.result()
+    report.write(f"## Pytest\nexit_code={test_rc}\n```\n{test_tail}\n```\n")
+    if test_rc != 0:
+        logger.error("Pytest failed; see QA_REPORT.md")
+    report.write(
+        f"## Semi E2E (qa_e2e_driver)\nexit_code={driver_rc}\n```\n{driver_tail}\n```"
+    )
+    if driver_rc != 0:
         logger.error("qa_e2e_driver failed; see QA_REPORT.md")
     # Save report
-    from pathlib import Path
-
     out_path = Path.cwd() / "QA_REPORT.md"
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text("\n".join(report_lines), encoding="utf-8")
+    out_path.write_text(report.getvalue(), encoding="utf-8")
     logger.info("QA report saved to %s", out_path)
     print(f"QA report: {out_path}")
 
 
 def cmd_test_all(args):
+    from core import db, db_pool, excel, notify, sla
+
     cfg = load_cfg(args)
     if args.send:
         cfg.allow_send = True
         cfg.safe_mode = False
     if args.safe:
         cfg.safe_mode = True
-    setup_logging(cfg.paths.log_dir)
-    from core import db
 
     steps = []
     ok = steps.append
     fail_msgs = []
 
     try:
-        db.ensure_schema(cfg)
+        with db_pool.get_conn(cfg):
+            pass
         ok("DB schema ok")
     except Exception as exc:
         fail_msgs.append(f"DB schema FAILED: {exc}")
 
     try:
-        conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-        ticket_ids = []
-        ticket_ids.append(db.seed_test_ticket(conn, status="new"))
-        ticket_ids.append(db.seed_test_ticket(conn, status="assigned"))
-        ticket_ids.append(db.seed_test_ticket(conn, status="overdue"))
-        conn.close()
+        with db_pool.get_conn(cfg) as conn:
+            ticket_ids = db.seed_test_tickets(conn, ["new", "assigned", "overdue"])
         ok(f"Seeded tickets {ticket_ids}")
     except Exception as exc:
         fail_msgs.append(f"Seed FAILED: {exc}")
@@ -206,26 +242,28 @@ def cmd_test_all(args):
 
     try:
         # emulate Excel edit: mark first row resolved if file exists
-        from pathlib import Path
-
-        import pandas as pd
-
         path = Path(cfg.paths.excel_path)
-        if path.exists():
-            df = pd.read_excel(path, sheet_name=excel.SHEET_TICKETS)
-            if not df.empty and "Статус" in df.columns:
-                df.loc[0, "Статус"] = sla.status_code_to_label(sla.STATUS_RESOLVED)
-                df.to_excel(path, sheet_name=excel.SHEET_TICKETS, index=False)
+        if not path.exists():
+            ok("Excel file absent; sync step skipped")
+        else:
+            from openpyxl import load_workbook
+
+            wb = load_workbook(path)
+            ws = wb[excel.SHEET_TICKETS]
+            header = {cell.value: cell.column for cell in ws[1]}
+            if ws.max_row >= 2 and "Статус" in header:
+                ws.cell(
+                    row=2,
+                    column=header["Статус"],
+                    value=sla.status_code_to_label(sla.STATUS_RESOLVED),
+                )
+                ticket_id = int(ws.cell(row=2, column=header["ticket_id"]).value)
+                wb.save(path)
                 res = excel.sync_from_excel(cfg)
                 ok(f"Excel->DB sync: {res}")
                 # verify DB updated
-                conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-                status = conn.execute(
-                    "SELECT status FROM tickets WHERE id=?",
-                    (int(df.loc[0, "ticket_id"]),),
-                ).fetchone()
-                conn.close()
-                if status and status["status"] == sla.STATUS_RESOLVED:
+                status = db.quick_get_status(cfg.paths.db_path, ticket_id)
+                if status == sla.STATUS_RESOLVED:
                     ok("DB status updated to resolved after sync")
                 else:
                     fail_msgs.append("DB status did not update after Excel sync")
@@ -254,15 +292,19 @@ def cmd_test_all(args):
 
 
 def cmd_sync_excel(args):
+    from core import excel
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     res = excel.sync_from_excel(cfg)
     logger.info("Excel sync: %s", res)
 
 
 def cmd_sync_all(args):
+    from core import excel, sla
+
     cfg = load_cfg(args)
-    logger = setup_logging(cfg.paths.log_dir)
+    logger = get_logger()
     days = args.days or cfg.ingest_days
     logger.info("== Шаг A: Excel -> DB ==")
     sync_res = (
@@ -310,18 +352,48 @@ def cmd_sync_all(args):
 
 def cmd_ui(args):
     cfg = load_cfg(args)
-    setup_logging(cfg.paths.log_dir)
     from ui.app import run_ui
 
     run_ui(cfg)
 
 
+# Settings read by recalc-open (SLA engine + recommendations refresh) and by
+# sync-excel; these commands load just these fields from config.json.
+RECALC_CFG_FIELDS = frozenset(
+    {
+        "paths",
+        "wal_mode",
+        "overdue_days",
+        "business_hours_start",
+        "business_hours_end",
+        "holidays",
+        "sla_by_priority",
+        "orm_similarity_days",
+        "orm_similarity_threshold",
+        "orm_max_suggestions",
+        "orm_script_path",
+    }
+)
+SYNC_EXCEL_CFG_FIELDS = frozenset(
+    {"paths", "wal_mode", "excel_lock_timeout_sec", "excel_password"}
+)
+
+
 def load_cfg(args) -> AppConfig:
-    if getattr(args, "config", None):
-        return AppConfig.load(args.config)
+    # AppConfig.load/load_partial keep the (path, mtime) cache and return
+    # private copies, so commands may mutate what they get.
+    config_path = getattr(args, "config", None) or None
+    cfg_fields = getattr(args, "cfg_fields", None)
+    if cfg_fields:
+        return AppConfig.load_partial(
+            Path(config_path) if config_path else None, cfg_fields
+        )
+    if config_path:
+        return AppConfig.load(Path(config_path))
     return default_config()
 
 
+@lru_cache(maxsize=1)
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="naos_sla", description="NAOS SLA tracker (refactored)"
@@ -356,14 +428,14 @@ def build_parser() -> argparse.ArgumentParser:
     p_ingest.set_defaults(func=cmd_ingest)
 
     p_recalc = sub.add_parser("recalc-open", help="Recalculate open tickets")
-    p_recalc.set_defaults(func=cmd_recalc)
+    p_recalc.set_defaults(func=cmd_recalc, cfg_fields=RECALC_CFG_FIELDS)
 
     p_export = sub.add_parser("export-xlsx", help="Export tickets to Excel")
     p_export.add_argument("--today-only", action="store_true")
     p_export.set_defaults(func=cmd_export)
 
     p_sync = sub.add_parser("sync-excel", help="Sync changes from Excel back to DB")
-    p_sync.set_defaults(func=cmd_sync_excel)
+    p_sync.set_defaults(func=cmd_sync_excel, cfg_fields=SYNC_EXCEL_CFG_FIELDS)
 
     p_send = sub.add_parser("send-overdue", help="Send overdue reminders")
     p_send.set_defaults(func=cmd_send_overdue)
@@ -396,6 +468,16 @@ def build_parser() -> argparse.ArgumentParser:
     p_qa.add_argument(
         "--no-wait", action="store_true", help="Skip manual Voting step (useful for CI)"
     )
+    p_qa.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Run pytest and the e2e driver one after another (debugging)",
+    )
+    p_qa.add_argument(
+        "--no-parallel",
+        action="store_true",
+        help="Run pytest without xdist workers (debug flaky tests)",
+    )
     p_qa.set_defaults(func=cmd_qa_full)
 
     p_ui = sub.add_parser("ui", help="Start desktop UI")
@@ -406,6 +488,7 @@ def build_parser() -> argparse.ArgumentParser:
 def main(argv: list[str] | None = None):
     parser = build_parser()
     args = parser.parse_args(argv)
+    setup_logging(load_cfg(args).paths.log_dir)
     args.func(args)
 
 
@@ -1,25 +1,162 @@
 from __future__ import annotations
 
+import codecs
+import copy
 import json
 import os
-from dataclasses import dataclass, field
+from dataclasses import MISSING, dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency, stdlib json fallback
+    orjson = None  # type: ignore
 
 APP_NAME = "NAOS_SLA_TRACKER"
 # Store data in %APPDATA%/NAOS_SLA_TRACKER for portable exe and single data dir.
 DEFAULT_APPDATA = Path(os.environ.get("APPDATA") or Path.cwd()) / APP_NAME
+# Set to "0" to stop load() from writing a default config.json on first run.
+AUTOSAVE_ENV = "NAOS_SLA_AUTOSAVE_CONFIG"
+
+# Parsed configs keyed by (path, mtime_ns): repeated loads of an unchanged file
+# within one process copy the cached object instead of re-parsing JSON.
+# Callers get their own deep copy because commands mutate it (allow_send,
+# safe_mode, sender_filter) and that must not leak into later loads.
+_CFG_CACHE: dict[tuple[str, int], "AppConfig"] = {}
+# Directories already created in this process; ensure() is called on every
+# config load and mkdir(exist_ok=True) still costs syscalls.
+_ENSURED: set[Path] = set()
 
 
 def _ensure_dir(path: Path) -> Path:
+    if path in _ENSURED:
+        return path
     path.mkdir(parents=True, exist_ok=True)
+    _ENSURED.add(path)
     return path
 
 
 def _expand_path(value) -> Path:
     if isinstance(value, Path):
         return value
-    return Path(os.path.expandvars(str(value))).expanduser()
+    raw = str(value)
+    # Most stored paths are already absolute; skip expandvars' regex scan.
+    if "$" not in raw and "%" not in raw and not raw.startswith("~"):
+        return Path(raw)
+    return Path(os.path.expandvars(raw)).expanduser()
+
+
+def _json_default(value):
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _json_loads(raw: bytes):
+    if orjson is None:
+        return json.loads(raw)
+    # Notepad-saved configs carry a UTF-8 BOM that orjson rejects.
+    return orjson.loads(
+        raw[len(codecs.BOM_UTF8) :] if raw.startswith(codecs.BOM_UTF8) else raw
+    )
+
+
+def _json_dumps(payload) -> bytes:
+    if orjson is None:
+        return json.dumps(
+            payload, ensure_ascii=False, indent=2, default=_json_default
+        ).encode("utf-8")
+    return orjson.dumps(
+        payload,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+        default=_json_default,
+    )
+
+
+def _domain_set(domains: Iterable[str]) -> frozenset:
+    return frozenset(d.lower().strip() for d in domains if d)
+
+
+@lru_cache(maxsize=8)
+def _recipient_sets(
+    allow_domains: Tuple[str, ...], allowlist: Tuple[str, ...]
+) -> Tuple[frozenset, frozenset]:
+    """Lowered (domains, addresses) sets, keyed by the current list contents."""
+    return _domain_set(allow_domains), frozenset(
+        a.lower().strip() for a in allowlist if a
+    )
+
+
+def _domain_matches(email: str, domains: frozenset) -> bool:
+    """True if the address is at one of domains or any of their subdomains."""
+    if not email or not domains or "@" not in email:
+        return False
+    host = email.rsplit("@", 1)[-1].lower()
+    while host:
+        if host in domains:
+            return True
+        _, _, host = host.partition(".")
+    return False
+
+
+def _field_default(f):
+    if f.default is not MISSING:
+        return f.default
+    return f.default_factory()
+
+
+# Casts applied to raw JSON values, keyed by the (string) field annotation.
+_FIELD_CASTS = {
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "str": str,
+    "List[str]": list,
+    "dict": dict,
+}
+# Fields where an empty value in config.json means "use the built-in default".
+_DEFAULT_IF_EMPTY = {
+    "escalation_matrix",
+    "sla_by_priority",
+    "status_catalog",
+    "status_hints",
+}
+
+# Built-in defaults, shared by every AppConfig; the field factories hand out
+# copies so per-instance edits never leak back into these.
+_DEFAULT_DOMAINS = ("ru.naos.com", "naos.com")
+_DEFAULT_TEST_ALLOWLIST = ("artem.shapovalov@ru.naos.com",)
+_DEFAULT_ESCALATION_MATRIX = {"p1": (), "p2": (), "p3": (), "p4": ()}
+_DEFAULT_STATUS_CATALOG = (
+    "new",
+    "assigned",
+    "responded",
+    "resolved",
+    "waiting_customer",
+    "table",
+    "otip",
+    "overdue",
+    "not_interesting",
+)
+_DEFAULT_STATUS_HINTS = {
+    "new": "Новое обращение, ещё не разобрали",
+    "assigned": "Назначено/переслано",
+    "responded": "Дан ответ",
+    "resolved": "Закрыто/решено",
+    "waiting_customer": "Ждём клиента",
+    "table": "Требуются данные врача/таблица",
+    "otip": "OTIP поток",
+    "overdue": "Просрочка SLA",
+    "not_interesting": "Неинтересно/спам/не наш",
+}
+_DEFAULT_SLA_BY_PRIORITY = {
+    "p1": {"first_response_hours": 4, "resolution_hours": 24},
+    "p2": {"first_response_hours": 8, "resolution_hours": 36},
+    "p3": {"first_response_hours": 16, "resolution_hours": 48},
+    "p4": {"first_response_hours": 24, "resolution_hours": 72},
+}
 
 
 @dataclass
@@ -61,11 +198,11 @@ class AppConfig:
     safe_mode: bool = True
     allow_send: bool = False
     send_allow_domains: List[str] = field(
-        default_factory=lambda: ["ru.naos.com", "naos.com"]
+        default_factory=lambda: list(_DEFAULT_DOMAINS)
     )
     send_allowlist: List[str] = field(default_factory=list)
     test_allowlist: List[str] = field(
-        default_factory=lambda: ["artem.shapovalov@ru.naos.com"]
+        default_factory=lambda: list(_DEFAULT_TEST_ALLOWLIST)
     )
     wal_mode: bool = True
     excel_lock_timeout_sec: int = 5
@@ -78,6 +215,9 @@ class AppConfig:
     docs_url: Optional[str] = None
     sharepoint_url: Optional[str] = None
     excel_password: str = "naos"
+    # Stream large exports through core.fast_xlsx instead of openpyxl.
+    fast_xlsx: bool = False
+    fast_xlsx_min_rows: int = 20000
     orm_similarity_days: int = 30
     orm_similarity_threshold: float = 0.42
     orm_max_suggestions: int = 3
@@ -88,232 +228,133 @@ class AppConfig:
     qa_mailbox_override: Optional[str] = None
     escalation_matrix: dict = field(
         default_factory=lambda: {
-            "p1": [],
-            "p2": [],
-            "p3": [],
-            "p4": [],
+            k: list(v) for k, v in _DEFAULT_ESCALATION_MATRIX.items()
         }
     )
     status_catalog: List[str] = field(
-        default_factory=lambda: [
-            "new",
-            "assigned",
-            "responded",
-            "resolved",
-            "waiting_customer",
-            "table",
-            "otip",
-            "overdue",
-            "not_interesting",
-        ]
-    )
-    status_hints: dict = field(
-        default_factory=lambda: {
-            "new": "Новое обращение, ещё не разобрали",
-            "assigned": "Назначено/переслано",
-            "responded": "Дан ответ",
-            "resolved": "Закрыто/решено",
-            "waiting_customer": "Ждём клиента",
-            "table": "Требуются данные врача/таблица",
-            "otip": "OTIP поток",
-            "overdue": "Просрочка SLA",
-            "not_interesting": "Неинтересно/спам/не наш",
-        }
+        default_factory=lambda: list(_DEFAULT_STATUS_CATALOG)
     )
+    status_hints: dict = field(default_factory=_DEFAULT_STATUS_HINTS.copy)
     customer_internal_domains: List[str] = field(
-        default_factory=lambda: ["ru.naos.com", "naos.com"]
+        default_factory=lambda: list(_DEFAULT_DOMAINS)
     )
     sla_by_priority: dict = field(
         default_factory=lambda: {
-            "p1": {"first_response_hours": 4, "resolution_hours": 24},
-            "p2": {"first_response_hours": 8, "resolution_hours": 36},
-            "p3": {"first_response_hours": 16, "resolution_hours": 48},
-            "p4": {"first_response_hours": 24, "resolution_hours": 72},
+            k: dict(v) for k, v in _DEFAULT_SLA_BY_PRIORITY.items()
         }
     )
     paths: Paths = field(default_factory=Paths)
 
+    def is_allowed_recipient(self, email: str) -> bool:
+        email_l = (email or "").strip().lower()
+        if not email_l:
+            return False
+        allow_domains, allowlist = _recipient_sets(
+            tuple(self.send_allow_domains or ()),
+            tuple(self.send_allowlist or ()) + tuple(self.test_allowlist or ()),
+        )
+        return email_l in allowlist or _domain_matches(email_l, allow_domains)
+
     @classmethod
     def load(cls, path: Optional[Path] = None) -> "AppConfig":
-        paths = Paths().ensure()
+        paths = Paths()
         cfg_path = path or (paths.appdata_dir / "config.json")
+        cfg_path = Path(cfg_path)
         if cfg_path.exists():
             try:
-                data = json.loads(cfg_path.read_text(encoding="utf-8"))
+                key = (str(cfg_path.resolve()), cfg_path.stat().st_mtime_ns)
+                cached = _CFG_CACHE.get(key)
+                if cached is not None:
+                    return copy.deepcopy(cached)
+                data = _json_loads(cfg_path.read_bytes())
                 cfg = cls.from_dict(data)
-                cfg.paths.ensure()
                 cfg.excel_password = os.environ.get(
                     "NAOS_EXCEL_PASSWORD", cfg.excel_password
                 )
-                return cfg
+                _CFG_CACHE[key] = cfg
+                return copy.deepcopy(cfg)
             except Exception:
                 pass
         cfg = cls(paths=paths.ensure())
         cfg.excel_password = os.environ.get("NAOS_EXCEL_PASSWORD", cfg.excel_password)
-        cfg.save(cfg_path)
+        # Only seed a missing file (never clobber an unreadable one), and let
+        # CI / read-only portable runs opt out; the UI save is the explicit path.
+        if not cfg_path.exists() and os.environ.get(AUTOSAVE_ENV, "1") != "0":
+            try:
+                cfg.save(cfg_path)
+            except OSError:
+                pass
+        return cfg
+
+    @classmethod
+    def load_partial(cls, path: Optional[Path], names: Iterable[str]) -> "AppConfig":
+        """Load only the named top-level fields; the rest keep their defaults.
+
+        For scheduler-polled commands that read a handful of settings. Falls
+        back to a full load when the file is missing or a full parse is
+        already cached.
+        """
+        cfg_path = Path(path or (Paths().appdata_dir / "config.json"))
+        try:
+            key = (str(cfg_path.resolve()), cfg_path.stat().st_mtime_ns)
+            cached = _CFG_CACHE.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            data = _json_loads(cfg_path.read_bytes())
+        except Exception:
+            return cls.load(cfg_path)
+        wanted = set(names)
+        cfg = cls.from_dict({k: v for k, v in data.items() if k in wanted})
+        if "excel_password" in wanted:
+            cfg.excel_password = os.environ.get(
+                "NAOS_EXCEL_PASSWORD", cfg.excel_password
+            )
         return cfg
 
     @classmethod
     def from_dict(cls, data: dict) -> "AppConfig":
         paths_data = data.get("paths") or {}
         paths = Paths(
-            appdata_dir=_expand_path(paths_data.get("appdata_dir", DEFAULT_APPDATA)),
-            log_dir=_expand_path(paths_data.get("log_dir", DEFAULT_APPDATA / "logs")),
-            db_path=_expand_path(
-                paths_data.get("db_path", DEFAULT_APPDATA / "naos_sla.sqlite3")
-            ),
-            excel_path=_expand_path(
-                paths_data.get("excel_path", DEFAULT_APPDATA / "tickets.xlsx")
-            ),
-            backup_dir=_expand_path(
-                paths_data.get("backup_dir", DEFAULT_APPDATA / "backups")
-            ),
-            orm_script_path=_expand_path(
-                paths_data.get("orm_script_path", "NAOS_ORM_master script.xlsx")
-            ),
+            **{
+                f.name: _expand_path(paths_data.get(f.name, _field_default(f)))
+                for f in fields(Paths)
+            }
         ).ensure()
-        return cls(
-            version=data.get("version", "1.3.0"),
-            sender_filter=data.get("sender_filter", "support@ru.naos.com"),
-            sender_filter_mode=data.get("sender_filter_mode")
-            or ("contains" if data.get("sender_filter") else "off"),
-            sender_filter_value=data.get("sender_filter_value"),
-            mailbox=data.get("mailbox"),
-            folder=data.get("folder"),
-            lookback_days_open=int(data.get("lookback_days_open", 35)),
-            ingest_days=int(data.get("ingest_days", 7)),
-            overdue_days=int(data.get("overdue_days", 2)),
-            timezone=data.get("timezone", "Europe/Moscow"),
-            safe_mode=bool(data.get("safe_mode", True)),
-            allow_send=bool(data.get("allow_send", False)),
-            send_allow_domains=list(
-                data.get(
-                    "send_allow_domains",
-                    data.get("customer_internal_domains", ["ru.naos.com", "naos.com"]),
-                )
-            ),
-            send_allowlist=list(data.get("send_allowlist", [])),
-            test_allowlist=list(
-                data.get("test_allowlist", ["artem.shapovalov@ru.naos.com"])
-            ),
-            wal_mode=bool(data.get("wal_mode", True)),
-            excel_lock_timeout_sec=int(data.get("excel_lock_timeout_sec", 5)),
-            business_hours_start=int(data.get("business_hours_start", 10)),
-            business_hours_end=int(data.get("business_hours_end", 19)),
-            holidays=list(data.get("holidays", [])),
-            quiet_hours_start=int(data.get("quiet_hours_start", 22)),
-            quiet_hours_end=int(data.get("quiet_hours_end", 8)),
-            reminder_interval_hours=int(data.get("reminder_interval_hours", 24)),
-            docs_url=data.get("docs_url"),
-            sharepoint_url=data.get("sharepoint_url"),
-            excel_password=str(data.get("excel_password", "naos")),
-            orm_similarity_days=int(data.get("orm_similarity_days", 30)),
-            orm_similarity_threshold=float(data.get("orm_similarity_threshold", 0.42)),
-            orm_max_suggestions=int(data.get("orm_max_suggestions", 3)),
-            orm_script_path=data.get("orm_script_path"),
-            qa_artem_email=data.get("qa_artem_email"),
-            qa_subject_prefix=data.get("qa_subject_prefix", "[QA][SLA]"),
-            qa_force_overdue_days=int(data.get("qa_force_overdue_days", 5)),
-            qa_mailbox_override=data.get("qa_mailbox_override"),
-            escalation_matrix=dict(data.get("escalation_matrix", {}))
-            or {"p1": [], "p2": [], "p3": [], "p4": []},
-            sla_by_priority=dict(data.get("sla_by_priority", {}))
-            or {
-                "p1": {"first_response_hours": 4, "resolution_hours": 24},
-                "p2": {"first_response_hours": 8, "resolution_hours": 36},
-                "p3": {"first_response_hours": 16, "resolution_hours": 48},
-                "p4": {"first_response_hours": 24, "resolution_hours": 72},
-            },
-            status_catalog=list(data.get("status_catalog", []))
-            or [
-                "new",
-                "assigned",
-                "responded",
-                "resolved",
-                "waiting_customer",
-                "table",
-                "otip",
-                "overdue",
-                "not_interesting",
-            ],
-            status_hints=dict(data.get("status_hints", {}))
-            or {
-                "new": "Новое обращение, ещё не разобрали",
-                "assigned": "Назначено/переслано",
-                "responded": "Дан ответ",
-                "resolved": "Закрыто/решено",
-                "waiting_customer": "Ждём клиента",
-                "table": "Требуются данные врача/таблица",
-                "otip": "OTIP поток",
-                "overdue": "Просрочка SLA",
-                "not_interesting": "Неинтересно/спам/не наш",
-            },
-            customer_internal_domains=list(
-                data.get("customer_internal_domains", ["ru.naos.com", "naos.com"])
-            ),
-            paths=paths,
-        )
+        kwargs = {}
+        for f in fields(cls):
+            if f.name == "paths" or f.name not in data:
+                continue
+            value = data[f.name]
+            if f.name in _DEFAULT_IF_EMPTY and not value:
+                continue
+            cast = _FIELD_CASTS.get(f.type)
+            kwargs[f.name] = cast(value) if cast else value
+        if not kwargs.get("sender_filter_mode"):
+            kwargs["sender_filter_mode"] = (
+                "contains" if data.get("sender_filter") else "off"
+            )
+        if "send_allow_domains" not in data and "customer_internal_domains" in data:
+            kwargs["send_allow_domains"] = list(data["customer_internal_domains"])
+        return cls(paths=paths, **kwargs)
+
+    @staticmethod
+    def invalidate_cache() -> None:
+        _CFG_CACHE.clear()
 
     def save(self, path: Optional[Path] = None) -> None:
-        cfg_path = path or (self.paths.appdata_dir / "config.json")
+        cfg_path = Path(path or (self.paths.appdata_dir / "config.json"))
         cfg_path.parent.mkdir(parents=True, exist_ok=True)
-        cfg_path.write_text(
-            json.dumps(
-                {
-                    "version": self.version,
-                    "sender_filter": self.sender_filter,
-                    "sender_filter_mode": self.sender_filter_mode,
-                    "sender_filter_value": self.sender_filter_value,
-                    "mailbox": self.mailbox,
-                    "folder": self.folder,
-                    "lookback_days_open": self.lookback_days_open,
-                    "ingest_days": self.ingest_days,
-                    "overdue_days": self.overdue_days,
-                    "timezone": self.timezone,
-                    "safe_mode": self.safe_mode,
-                    "allow_send": self.allow_send,
-                    "send_allow_domains": self.send_allow_domains,
-                    "send_allowlist": self.send_allowlist,
-                    "test_allowlist": self.test_allowlist,
-                    "wal_mode": self.wal_mode,
-                    "excel_lock_timeout_sec": self.excel_lock_timeout_sec,
-                    "business_hours_start": self.business_hours_start,
-                    "business_hours_end": self.business_hours_end,
-                    "holidays": self.holidays,
-                    "quiet_hours_start": self.quiet_hours_start,
-                    "quiet_hours_end": self.quiet_hours_end,
-                    "reminder_interval_hours": self.reminder_interval_hours,
-                    "docs_url": self.docs_url,
-                    "sharepoint_url": self.sharepoint_url,
-                    "excel_password": self.excel_password,
-                    "orm_similarity_days": self.orm_similarity_days,
-                    "orm_similarity_threshold": self.orm_similarity_threshold,
-                    "orm_max_suggestions": self.orm_max_suggestions,
-                    "orm_script_path": self.orm_script_path
-                    or str(self.paths.orm_script_path),
-                    "qa_artem_email": self.qa_artem_email,
-                    "qa_subject_prefix": self.qa_subject_prefix,
-                    "qa_force_overdue_days": self.qa_force_overdue_days,
-                    "qa_mailbox_override": self.qa_mailbox_override,
-                    "escalation_matrix": self.escalation_matrix,
-                    "sla_by_priority": self.sla_by_priority,
-                    "status_catalog": self.status_catalog,
-                    "status_hints": self.status_hints,
-                    "customer_internal_domains": self.customer_internal_domains,
-                    "paths": {
-                        "appdata_dir": str(self.paths.appdata_dir),
-                        "log_dir": str(self.paths.log_dir),
-                        "db_path": str(self.paths.db_path),
-                        "excel_path": str(self.paths.excel_path),
-                        "backup_dir": str(self.paths.backup_dir),
-                        "orm_script_path": str(self.paths.orm_script_path),
-                    },
-                },
-                ensure_ascii=False,
-                indent=2,
-            ),
-            encoding="utf-8",
+        payload = {
+            f.name: getattr(self, f.name) for f in fields(self) if f.name != "paths"
+        }
+        payload["orm_script_path"] = self.orm_script_path or str(
+            self.paths.orm_script_path
         )
+        payload["paths"] = {
+            f.name: str(getattr(self.paths, f.name)) for f in fields(Paths)
+        }
+        cfg_path.write_bytes(_json_dumps(payload))
+        AppConfig.invalidate_cache()
 
 
 def default_config() -> AppConfig:
@@ -1,18 +1,32 @@
 from __future__ import annotations
 
+import operator
 import sqlite3
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Sequence
+from time import time
+from typing import Iterator, List, Optional, Sequence
 
 from config import AppConfig
 from core.logger import get_logger
 
 log = get_logger(__name__)
 
+# Bind datetimes as "YYYY-MM-DD HH:MM:SS[.ffffff]" text, the same format as
+# the implicit sqlite3 adapter (deprecated in 3.12) and SQLite's
+# datetime('now'), so stored values keep sorting chronologically. A partial
+# over the C method avoids a Python-level adapter call per value.
+sqlite3.register_adapter(datetime, partial(datetime.isoformat, sep=" "))
 
-@dataclass
+# Per-connection LRU of compiled statements (sqlite3 default is 128). SQL
+# text is kept in module constants so repeated calls hit this cache.
+STATEMENT_CACHE_SIZE = 256
+
+
+@dataclass(slots=True)
 class TicketRecord:
     id: Optional[int]
     conv_id: Optional[str]
@@ -50,7 +64,10 @@ class TicketRecord:
 
 def connect(db_path: Path, wal_mode: bool = True) -> sqlite3.Connection:
     conn = sqlite3.connect(
-        db_path, timeout=10, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES
+        db_path,
+        timeout=10,
+        isolation_level="DEFERRED",
+        cached_statements=STATEMENT_CACHE_SIZE,
     )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys=ON;")
@@ -59,11 +76,56 @@ def connect(db_path: Path, wal_mode: bool = True) -> sqlite3.Connection:
             conn.execute("PRAGMA journal_mode=WAL;")
         except sqlite3.DatabaseError as exc:
             log.warning("WAL mode not available: %s", exc)
+        else:
+            # NORMAL is durable across app crashes in WAL mode; only the
+            # fsync per commit is dropped.
+            _apply_pragmas(conn, _WAL_PRAGMAS)
+    _apply_pragmas(conn, _TUNING_PRAGMAS)
     return conn
 
 
+# Shared-cache mode is deliberately not used: it regresses under WAL.
+_WAL_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA wal_autocheckpoint=1000;",
+)
+_TUNING_PRAGMAS = (
+    "PRAGMA cache_size=-65536;",  # 64 MiB page cache
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",  # 256 MiB
+)
+
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas: Sequence[str]) -> None:
+    for pragma in pragmas:
+        try:
+            conn.execute(pragma)
+        except sqlite3.DatabaseError as exc:
+            log.warning("%s not applied: %s", pragma, exc)
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """BEGIN IMMEDIATE ... COMMIT around the block, ROLLBACK on error.
+
+    Inside an already open transaction the block simply joins it; the outer
+    owner commits. Write helpers (upsert_ticket, log_event) never commit.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
 def ensure_schema(cfg: AppConfig) -> None:
     cfg.paths.ensure()
+    _close_readonly_connections()
     conn = connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
     cur = conn.cursor()
     cur.executescript(
@@ -86,10 +148,8 @@ def ensure_schema(cfg: AppConfig) -> None:
           status TEXT NOT NULL,
           last_status_utc TEXT NOT NULL,
           days_without_update INTEGER NOT NULL DEFAULT 0,
-          overdue INTEGER NOT NULL DEFAULT 0,
-          not_interesting INTEGER NOT NULL DEFAULT 0,
+          flags INTEGER NOT NULL DEFAULT 0,
           customer_email TEXT,
-          is_repeat INTEGER NOT NULL DEFAULT 0,
           repeat_hint TEXT,
           recommended_answer TEXT,
           match_score REAL,
@@ -104,6 +164,15 @@ def ensure_schema(cfg: AppConfig) -> None:
           UNIQUE(conv_id, thread_key),
           UNIQUE(stable_id)
         );
+        CREATE INDEX IF NOT EXISTS idx_tickets_first_received
+          ON tickets(first_received_utc DESC);
+        CREATE INDEX IF NOT EXISTS idx_tickets_conv
+          ON tickets(conv_id, first_received_utc DESC);
+        CREATE INDEX IF NOT EXISTS idx_tickets_thread
+          ON tickets(thread_key, first_received_utc DESC);
+        CREATE INDEX IF NOT EXISTS idx_tickets_open
+          ON tickets(status, priority, first_received_utc, first_reply_utc,
+                     last_status_utc, id);
         CREATE TABLE IF NOT EXISTS answers (
           id INTEGER PRIMARY KEY AUTOINCREMENT,
           ticket_id INTEGER,
@@ -124,15 +193,24 @@ def ensure_schema(cfg: AppConfig) -> None:
         );
         """
     )
-    _ensure_column(cur, "tickets", "row_version", "INTEGER NOT NULL DEFAULT 1")
-    _ensure_column(cur, "tickets", "last_reminder_utc", "TEXT")
-    _ensure_column(cur, "tickets", "priority", "TEXT")
-    _ensure_column(cur, "tickets", "stable_id", "TEXT")
-    _ensure_column(cur, "tickets", "last_updated_at", "TEXT")
-    _ensure_column(cur, "tickets", "last_updated_by", "TEXT")
-    _ensure_column(cur, "tickets", "data_source", "TEXT")
-    _ensure_column(cur, "tickets", "comment", "TEXT")
-    _migrate_statuses(cur)
+    cur.execute("PRAGMA table_info(tickets)")
+    existing = {r[1] for r in cur}
+    _ensure_column(
+        cur, existing, "tickets", "row_version", "INTEGER NOT NULL DEFAULT 1"
+    )
+    _ensure_column(cur, existing, "tickets", "last_reminder_utc", "TEXT")
+    _ensure_column(cur, existing, "tickets", "priority", "TEXT")
+    _ensure_column(cur, existing, "tickets", "stable_id", "TEXT")
+    _ensure_column(cur, existing, "tickets", "last_updated_at", "TEXT")
+    _ensure_column(cur, existing, "tickets", "last_updated_by", "TEXT")
+    _ensure_column(cur, existing, "tickets", "data_source", "TEXT")
+    _ensure_column(cur, existing, "tickets", "comment", "TEXT")
+    if "flags" not in existing:
+        _ensure_column(cur, existing, "tickets", "flags", "INTEGER NOT NULL DEFAULT 0")
+        _fold_legacy_flags(cur, existing)
+    _migrate_statuses(cur, existing)
+    cur.execute(f"DROP VIEW IF EXISTS {TICKETS_VIEW}")
+    cur.execute(_SQL_CREATE_VIEW)
     conn.commit()
     conn.close()
 
@@ -148,90 +226,273 @@ STATUS_MIGRATION = {
     "?ç ñ?‘'ç‘?ç‘???": "not_interesting",
 }
 
+# Legacy 'in_table' was later renamed to 'table'; fold both steps into one
+# CASE so the migration is a single pass over tickets.
+_STATUS_RENAMES = {
+    **{
+        old: ("table" if new == "in_table" else new)
+        for old, new in STATUS_MIGRATION.items()
+    },
+    "in_table": "table",
+}
+_SQL_MIGRATE_STATUSES = (
+    "UPDATE tickets SET status = CASE status "
+    + " ".join("WHEN ? THEN ?" for _ in _STATUS_RENAMES)
+    + " END WHERE status IN ("
+    + ", ".join("?" for _ in _STATUS_RENAMES)
+    + ")"
+)
+_MIGRATE_STATUS_PARAMS = (
+    *(v for pair in _STATUS_RENAMES.items() for v in pair),
+    *_STATUS_RENAMES,
+)
 
-def _migrate_statuses(cur: sqlite3.Cursor) -> None:
-    cur.execute("PRAGMA table_info(tickets)")
-    cols = {r[1] for r in cur.fetchall()}
-    if "status" not in cols:
+
+def _migrate_statuses(cur: sqlite3.Cursor, existing_cols: set[str]) -> None:
+    if "status" not in existing_cols:
         return
-    for old, new in STATUS_MIGRATION.items():
-        cur.execute("UPDATE tickets SET status=? WHERE status=?", (new, old))
-    cur.execute("UPDATE tickets SET status='table' WHERE status='in_table'")
+    cur.execute(_SQL_MIGRATE_STATUSES, _MIGRATE_STATUS_PARAMS)
+
 
+def _fold_legacy_flags(cur: sqlite3.Cursor, existing_cols: set[str]) -> None:
+    """Copy the pre-flags boolean columns into flags, then drop them.
 
-def _ensure_column(cur: sqlite3.Cursor, table: str, name: str, ddl: str) -> None:
-    cur.execute(f"PRAGMA table_info({table})")
-    cols = {r[1] for r in cur.fetchall()}
-    if name not in cols:
+    SQLite before 3.35 cannot drop columns; there they stay, unused.
+    """
+    legacy = [c for c in _FLAG_BITS if c in existing_cols]
+    if not legacy:
+        return
+    cur.execute(
+        "UPDATE tickets SET flags = "
+        + " | ".join(f"(({c} != 0) * {_FLAG_BITS[c]})" for c in legacy)
+    )
+    if not _HAS_DROP_COLUMN:
+        return
+    for c in legacy:
+        cur.execute(f"ALTER TABLE tickets DROP COLUMN {c}")
+        existing_cols.discard(c)
+
+
+def _ensure_column(
+    cur: sqlite3.Cursor, existing_cols: set[str], table: str, name: str, ddl: str
+) -> None:
+    """Add table.name unless present; existing_cols is updated in place."""
+    if name not in existing_cols:
         log.info("Adding column %s.%s", table, name)
         cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+        existing_cols.add(name)
+
+
+# Ticket fields as seen by readers, in TicketRecord order.
+_RECORD_COLS = (
+    "conv_id",
+    "thread_key",
+    "entry_id",
+    "first_received_utc",
+    "sender",
+    "subject",
+    "body",
+    "first_forward_utc",
+    "first_forward_to",
+    "first_reply_utc",
+    "first_reply_body",
+    "responsible",
+    "status",
+    "last_status_utc",
+    "days_without_update",
+    "overdue",
+    "not_interesting",
+    "customer_email",
+    "is_repeat",
+    "repeat_hint",
+    "recommended_answer",
+    "match_score",
+    "topic",
+    "last_reminder_utc",
+    "priority",
+    "stable_id",
+    "last_updated_at",
+    "last_updated_by",
+    "data_source",
+    "comment",
+    "row_version",
+)
+# overdue, not_interesting and is_repeat are stored as bits of tickets.flags;
+# tickets_view exposes them as 0/1 columns under their old names.
+FLAG_OVERDUE = 1
+FLAG_NOT_INTERESTING = 2
+FLAG_IS_REPEAT = 4
+_FLAG_BITS = {
+    "overdue": FLAG_OVERDUE,
+    "not_interesting": FLAG_NOT_INTERESTING,
+    "is_repeat": FLAG_IS_REPEAT,
+}
+_HAS_DROP_COLUMN = sqlite3.sqlite_version_info >= (3, 35, 0)
+_UPSERT_COLS = tuple(c for c in _RECORD_COLS if c not in _FLAG_BITS) + ("flags",)
+_UPSERT_PLACEHOLDERS = ", ".join("?" * len(_UPSERT_COLS))
+# first_received_utc is kept from the original insert; row_version is bumped
+# below (SQLite would ignore an earlier excluded.row_version assignment).
+_UPSERT_UPDATE_EXPR = ", ".join(
+    f"{c}=excluded.{c}"
+    for c in _UPSERT_COLS
+    if c not in ("first_received_utc", "row_version")
+)
+_SQL_UPSERT_TICKET = f"""
+    INSERT INTO tickets ({", ".join(_UPSERT_COLS)})
+    VALUES ({_UPSERT_PLACEHOLDERS})
+    ON CONFLICT(conv_id, thread_key) DO UPDATE SET
+      {_UPSERT_UPDATE_EXPR},
+      row_version = tickets.row_version + 1
+    """
+# RETURNING (SQLite 3.35+) yields the id for both the insert and the update
+# path, saving the follow-up SELECT.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_SQL_UPSERT_TICKET_RETURNING = _SQL_UPSERT_TICKET + " RETURNING id"
+_SQL_TICKET_ID_BY_KEY = "SELECT id FROM tickets WHERE conv_id=? AND thread_key=?"
+_SQL_LOG_EVENT = """
+    INSERT OR IGNORE INTO events (ticket_id, event_type, status_before, status_after, source, raw_response, item_entry_id, event_dt_utc)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+TICKET_COLUMNS = ("id",) + _RECORD_COLS
+TICKETS_VIEW = "tickets_view"
+_VIEW_COLUMNS = ", ".join(
+    f"((flags & {_FLAG_BITS[c]}) != 0) AS {c}" if c in _FLAG_BITS else c
+    for c in TICKET_COLUMNS
+)
+_SQL_CREATE_VIEW = f"CREATE VIEW {TICKETS_VIEW} AS SELECT {_VIEW_COLUMNS} FROM tickets"
+# Large text columns left out of fetch_tickets by default; read them with
+# fetch_tickets_full or get_ticket_body.
+_BODY_COLUMNS = frozenset({"body", "first_reply_body"})
+_DEFAULT_COLUMNS = tuple(c for c in TICKET_COLUMNS if c not in _BODY_COLUMNS)
+_SQL_FETCH_BASE = f"SELECT {', '.join(_DEFAULT_COLUMNS)} FROM {TICKETS_VIEW}"
+_SQL_FETCH_FULL = f"SELECT {', '.join(TICKET_COLUMNS)} FROM {TICKETS_VIEW}"
+_SQL_TICKET_BODY = "SELECT body FROM tickets WHERE id=?"
+# first_received_utc is ISO-8601 text, so plain ordering is chronological and
+# can use idx_tickets_first_received (datetime() would force a full sort).
+_SQL_FETCH_ORDER = " ORDER BY first_received_utc DESC"
+_SQL_MARK_ROW_VERSION = (
+    "UPDATE tickets SET row_version = row_version + 1, "
+    "last_status_utc=datetime('now') WHERE id=?"
+)
+# Rows per executemany batch / per id lookup (two bound variables per key,
+# kept under SQLite's historical 999-variable limit).
+UPSERT_BATCH_SIZE = 499
 
 
-def upsert_ticket(conn: sqlite3.Connection, ticket: TicketRecord) -> int:
-    payload = ticket.__dict__.copy()
-    payload["overdue"] = 1 if ticket.overdue else 0
-    payload["not_interesting"] = 1 if ticket.not_interesting else 0
-    payload["is_repeat"] = 1 if ticket.is_repeat else 0
-    cols = [
-        "conv_id",
-        "thread_key",
-        "entry_id",
-        "first_received_utc",
-        "sender",
-        "subject",
-        "body",
-        "first_forward_utc",
-        "first_forward_to",
-        "first_reply_utc",
-        "first_reply_body",
-        "responsible",
-        "status",
-        "last_status_utc",
-        "days_without_update",
-        "overdue",
-        "not_interesting",
-        "customer_email",
-        "is_repeat",
-        "repeat_hint",
-        "recommended_answer",
-        "match_score",
-        "topic",
-        "last_reminder_utc",
-        "priority",
-        "stable_id",
-        "last_updated_at",
-        "last_updated_by",
-        "data_source",
-        "comment",
-        "row_version",
-    ]
-    placeholders = ", ".join("?" for _ in cols)
-    update_expr = ", ".join(
-        f"{c}=excluded.{c}" for c in cols if c not in ("first_received_utc",)
+_UPSERT_GETTER = operator.attrgetter(*_UPSERT_COLS[:-1])
+
+
+def _ticket_params(ticket: TicketRecord) -> tuple:
+    return (
+        *_UPSERT_GETTER(ticket),
+        int(ticket.overdue)
+        | (int(ticket.not_interesting) << 1)
+        | (int(ticket.is_repeat) << 2),
     )
+
+
+def upsert_ticket(
+    conn: sqlite3.Connection, ticket: TicketRecord, return_id: bool = True
+) -> int:
+    """Insert or update by (conv_id, thread_key); returns the row id.
+
+    With return_id=False the id is not looked up and 0 is returned.
+    """
+    if not return_id:
+        conn.execute(_SQL_UPSERT_TICKET, _ticket_params(ticket))
+        return 0
     cur = conn.cursor()
-    cur.execute(
-        f"""
-        INSERT INTO tickets ({", ".join(cols)})
-        VALUES ({placeholders})
-        ON CONFLICT(conv_id, thread_key) DO UPDATE SET
-          {update_expr},
-          row_version = tickets.row_version + 1
-        """,
-        tuple(payload.get(c) for c in cols),
-    )
+    if _HAS_RETURNING:
+        cur.execute(_SQL_UPSERT_TICKET_RETURNING, _ticket_params(ticket))
+        return int(cur.fetchone()[0])
+    cur.execute(_SQL_UPSERT_TICKET, _ticket_params(ticket))
     if ticket.id is None:
         ticket_id = cur.lastrowid
     else:
-        cur.execute(
-            "SELECT id FROM tickets WHERE conv_id=? AND thread_key=?",
-            (ticket.conv_id, ticket.thread_key),
-        )
+        cur.execute(_SQL_TICKET_ID_BY_KEY, (ticket.conv_id, ticket.thread_key))
         row = cur.fetchone()
         ticket_id = row["id"] if row else ticket.id
     return int(ticket_id)
 
 
+def upsert_tickets(
+    conn: sqlite3.Connection, tickets: Sequence[TicketRecord], return_ids: bool = True
+) -> List[int]:
+    """Upsert many tickets with executemany; returns ids in input order.
+
+    Runs in one transaction unless the caller already opened one. With
+    return_ids=False the ids are not looked up and [] is returned.
+    """
+    if not tickets:
+        return []
+    ids: dict = {}
+    with write_transaction(conn):
+        for start in range(0, len(tickets), UPSERT_BATCH_SIZE):
+            chunk = tickets[start : start + UPSERT_BATCH_SIZE]
+            conn.executemany(_SQL_UPSERT_TICKET, [_ticket_params(t) for t in chunk])
+            if not return_ids:
+                continue
+            keys = [(t.conv_id, t.thread_key) for t in chunk]
+            values = ", ".join("(?, ?)" for _ in keys)
+            rows = conn.execute(
+                f"""
+                WITH k(conv_id, thread_key) AS (VALUES {values})
+                SELECT t.conv_id, t.thread_key, t.id
+                FROM tickets t JOIN k
+                  ON t.conv_id IS k.conv_id AND t.thread_key = k.thread_key
+                ORDER BY t.id
+                """,
+                [v for key in keys for v in key],
+            )
+            for conv_id, thread_key, ticket_id in rows:
+                ids[(conv_id, thread_key)] = ticket_id
+    if not return_ids:
+        return []
+    return [int(ids[(t.conv_id, t.thread_key)]) for t in tickets]
+
+
+_STAGE_TABLE = "tix_stage"
+_SQL_CREATE_STAGE = f"CREATE TEMP TABLE {_STAGE_TABLE} ({', '.join(_UPSERT_COLS)})"
+_SQL_FILL_STAGE = (
+    f"INSERT INTO {_STAGE_TABLE} ({', '.join(_UPSERT_COLS)}) "
+    f"VALUES ({_UPSERT_PLACEHOLDERS})"
+)
+# "WHERE true" disambiguates ON CONFLICT from a join constraint after SELECT.
+_SQL_MERGE_STAGE = f"""
+    INSERT INTO tickets ({", ".join(_UPSERT_COLS)})
+    SELECT {", ".join(_UPSERT_COLS)} FROM {_STAGE_TABLE} WHERE true ORDER BY rowid
+    ON CONFLICT(conv_id, thread_key) DO UPDATE SET
+      {_UPSERT_UPDATE_EXPR},
+      row_version = tickets.row_version + 1
+    RETURNING id, conv_id, thread_key
+    """
+
+
+def bulk_upsert_tickets(
+    conn: sqlite3.Connection, tickets: Sequence[TicketRecord]
+) -> List[int]:
+    """Stage tickets in a temp table and merge them with one INSERT ... SELECT.
+
+    Same result and id order as upsert_tickets; for large ingests, conflict
+    handling runs inside a single statement. Needs RETURNING (SQLite 3.35+),
+    otherwise falls back to upsert_tickets.
+    """
+    if not tickets:
+        return []
+    if not _HAS_RETURNING:
+        return upsert_tickets(conn, tickets)
+    ids: dict = {}
+    with write_transaction(conn):
+        conn.execute(_SQL_CREATE_STAGE)
+        try:
+            conn.executemany(_SQL_FILL_STAGE, [_ticket_params(t) for t in tickets])
+            for ticket_id, conv_id, thread_key in conn.execute(_SQL_MERGE_STAGE):
+                ids[(conv_id, thread_key)] = ticket_id
+        finally:
+            conn.execute(f"DROP TABLE {_STAGE_TABLE}")
+    return [int(ids[(t.conv_id, t.thread_key)]) for t in tickets]
+
+
 def log_event(
     conn: sqlite3.Connection,
     ticket_id: int,
@@ -242,60 +503,169 @@ def log_event(
     raw_response: Optional[str] = None,
     item_entry_id: Optional[str] = None,
 ) -> None:
-    conn.execute(
-        """
-        INSERT OR IGNORE INTO events (ticket_id, event_type, status_before, status_after, source, event_dt_utc, raw_response, item_entry_id)
-        VALUES (?, ?, ?, ?, ?, datetime('now'), ?, ?)
-        """,
-        (
-            ticket_id,
-            event_type,
-            status_before,
-            status_after,
-            source,
-            raw_response,
-            item_entry_id,
-        ),
+    log_events(
+        conn,
+        [
+            (
+                ticket_id,
+                event_type,
+                status_before,
+                status_after,
+                source,
+                raw_response,
+                item_entry_id,
+            )
+        ],
     )
 
 
+def log_events(conn: sqlite3.Connection, events: Sequence[tuple]) -> None:
+    """Insert many events in one executemany, all stamped with the same time.
+
+    Each event is (ticket_id, event_type, status_before, status_after, source,
+    raw_response, item_entry_id), matching log_event's arguments.
+    """
+    # Same text format as SQLite's datetime('now').
+    now = datetime.utcnow().isoformat(sep=" ", timespec="seconds")
+    conn.executemany(_SQL_LOG_EVENT, [(*event, now) for event in events])
+
+
+# Rows pulled per fetchmany() by iter_tickets.
+FETCH_BATCH_SIZE = 256
+
+
 def fetch_tickets(
-    conn: sqlite3.Connection, where: str = "", params: Sequence = ()
+    conn: sqlite3.Connection,
+    where: str = "",
+    params: Sequence = (),
+    columns: Optional[Sequence[str]] = None,
+    raw: bool = False,
 ) -> List[sqlite3.Row]:
-    sql = """
-    SELECT
-      id, conv_id, thread_key, entry_id, first_received_utc, sender, subject, body,
-      first_forward_utc, first_forward_to, first_reply_utc, first_reply_body,
-      responsible, status, last_status_utc, days_without_update, overdue, not_interesting,
-      customer_email, is_repeat, repeat_hint, recommended_answer, match_score, topic, last_reminder_utc,
-      priority, stable_id, last_updated_at, last_updated_by, data_source, comment, row_version
-    FROM tickets
+    """Ticket rows without the body columns unless columns names them.
+
+    raw=True returns plain tuples (no per-row Row objects) in column order.
     """
+    return _execute_fetch(conn, _select_sql(columns), where, params, raw).fetchall()
+
+
+def fetch_tickets_full(
+    conn: sqlite3.Connection, where: str = "", params: Sequence = (), raw: bool = False
+) -> List[sqlite3.Row]:
+    return _execute_fetch(conn, _SQL_FETCH_FULL, where, params, raw).fetchall()
+
+
+def iter_tickets(
+    conn: sqlite3.Connection,
+    where: str = "",
+    params: Sequence = (),
+    columns: Optional[Sequence[str]] = None,
+    raw: bool = False,
+) -> Iterator[sqlite3.Row]:
+    """Like fetch_tickets, but streams rows FETCH_BATCH_SIZE at a time."""
+    cur = _execute_fetch(conn, _select_sql(columns), where, params, raw)
+    while True:
+        batch = cur.fetchmany()
+        if not batch:
+            return
+        yield from batch
+
+
+def _select_sql(columns: Optional[Sequence[str]]) -> str:
+    if columns is None:
+        return _SQL_FETCH_BASE
+    unknown = set(columns).difference(TICKET_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown ticket columns: {sorted(unknown)}")
+    return f"SELECT {', '.join(columns)} FROM {TICKETS_VIEW}"
+
+
+def _execute_fetch(
+    conn: sqlite3.Connection, sql: str, where: str, params: Sequence, raw: bool
+) -> sqlite3.Cursor:
     if where:
         sql += f" WHERE {where}"
-    sql += " ORDER BY datetime(first_received_utc) DESC"
+    sql += _SQL_FETCH_ORDER
     cur = conn.cursor()
+    cur.arraysize = FETCH_BATCH_SIZE
+    if raw:
+        cur.row_factory = None
     cur.execute(sql, params)
-    return cur.fetchall()
+    return cur
+
+
+def get_ticket_body(conn: sqlite3.Connection, ticket_id: int) -> Optional[str]:
+    row = conn.execute(_SQL_TICKET_BODY, (ticket_id,)).fetchone()
+    return row[0] if row else None
 
 
 def mark_row_version(conn: sqlite3.Connection, ticket_id: int) -> None:
-    conn.execute(
-        "UPDATE tickets SET row_version = row_version + 1, last_status_utc=datetime('now') WHERE id=?",
-        (ticket_id,),
+    conn.execute(_SQL_MARK_ROW_VERSION, (ticket_id,))
+
+
+# Read-only connections for one-shot lookups, keyed by resolved db path.
+# They skip the WAL/pragma setup of connect() and are reused across calls.
+_READONLY_CONNS: dict[str, sqlite3.Connection] = {}
+
+
+def _readonly_connect(db_path: Path) -> sqlite3.Connection:
+    resolved = Path(db_path).resolve()
+    key = str(resolved)
+    conn = _READONLY_CONNS.get(key)
+    if conn is None:
+        conn = sqlite3.connect(
+            f"{resolved.as_uri()}?mode=ro",
+            uri=True,
+            timeout=10,
+            check_same_thread=False,
+        )
+        _READONLY_CONNS[key] = conn
+    return conn
+
+
+def _close_readonly_connections() -> None:
+    for conn in _READONLY_CONNS.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _READONLY_CONNS.clear()
+
+
+def quick_get_status(db_path: Path, ticket_id: int) -> Optional[str]:
+    row = (
+        _readonly_connect(db_path)
+        .execute("SELECT status FROM tickets WHERE id=?", (ticket_id,))
+        .fetchone()
     )
+    return row[0] if row else None
 
 
 def seed_test_ticket(conn: sqlite3.Connection, status: str = "overdue") -> int:
-    now = datetime.utcnow()
-    subject = f"[TEST][SLA] Synthetic {status} ticket"
+    with write_transaction(conn):
+        return _insert_test_ticket(conn, status)
+
+
+def seed_test_tickets(conn: sqlite3.Connection, statuses: Sequence[str]) -> List[int]:
+    """Seed one synthetic ticket per status inside a single transaction."""
+    with write_transaction(conn):
+        return [_insert_test_ticket(conn, status) for status in statuses]
+
+
+def _insert_test_ticket(conn: sqlite3.Connection, status: str) -> int:
+    now_ts = time()
     days = 5 if status == "overdue" else 0
+    # Stored timestamps are naive UTC text, so drop tzinfo after conversion.
+    now = datetime.fromtimestamp(now_ts, tz=timezone.utc).replace(tzinfo=None)
+    since = datetime.fromtimestamp(now_ts - days * 86400, tz=timezone.utc).replace(
+        tzinfo=None
+    )
+    subject = f"[TEST][SLA] Synthetic {status} ticket"
     record = TicketRecord(
         id=None,
-        conv_id=f"test-{status}-{int(now.timestamp())}",
-        thread_key=f"test-thread-{status}-{int(now.timestamp())}",
+        conv_id=f"test-{status}-{int(now_ts)}",
+        thread_key=f"test-thread-{status}-{int(now_ts)}",
         entry_id=None,
-        first_received_utc=now - timedelta(days=days),
+        first_received_utc=since,
         sender="test@example.com",
         subject=subject,
         body="Synthetic test ticket to validate SLA tracker.",
@@ -305,7 +675,7 @@ def seed_test_ticket(conn: sqlite3.Connection, status: str = "overdue") -> int:
         first_reply_body=None,
         responsible="responsible@example.com" if status != "new" else None,
         status=status,
-        last_status_utc=now - timedelta(days=days),
+        last_status_utc=since,
         days_without_update=days,
         overdue=status == "overdue",
         not_interesting=False,
@@ -325,5 +695,4 @@ def seed_test_ticket(conn: sqlite3.Connection, status: str = "overdue") -> int:
     )
     ticket_id = upsert_ticket(conn, record)
     log_event(conn, ticket_id, "seed_test_ticket", None, record.status, "test-all")
-    conn.commit()
     return ticket_id
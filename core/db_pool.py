@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+from config import AppConfig
+from core import db
+
+# Idle connections kept per database; WAL serves one writer and many readers.
+POOL_SIZE = min(os.cpu_count() or 1, 8)
+
+# sqlite3 connections are bound to their creating thread, so each thread keeps
+# its own queues, keyed by (resolved db path, wal_mode).
+_local = threading.local()
+_schema_lock = threading.Lock()
+_SCHEMA_READY: set[str] = set()
+
+
+def _pools() -> Dict[Tuple[str, bool], queue.SimpleQueue]:
+    pools = getattr(_local, "pools", None)
+    if pools is None:
+        pools = _local.pools = {}
+    return pools
+
+
+def _ensure_schema_once(cfg: AppConfig, key: str) -> None:
+    if key in _SCHEMA_READY:
+        return
+    with _schema_lock:
+        if key not in _SCHEMA_READY:
+            db.ensure_schema(cfg)
+            _SCHEMA_READY.add(key)
+
+
+@contextmanager
+def get_conn(cfg: AppConfig) -> Iterator[sqlite3.Connection]:
+    """Borrow a configured connection for cfg's database.
+
+    Commits on normal exit and rolls back on error, like ``with conn:``.
+    The schema is ensured on the first checkout per database per process.
+    """
+    path = str(Path(cfg.paths.db_path).resolve())
+    _ensure_schema_once(cfg, path)
+    pool = _pools().setdefault((path, cfg.wal_mode), queue.SimpleQueue())
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        _release(pool, conn)
+        raise
+    conn.commit()
+    _release(pool, conn)
+
+
+def _release(pool: queue.SimpleQueue, conn: sqlite3.Connection) -> None:
+    if pool.qsize() >= POOL_SIZE:
+        conn.close()
+    else:
+        pool.put(conn)
+
+
+def close_all() -> None:
+    """Close this thread's idle connections and forget ensured schemas."""
+    for pool in _pools().values():
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+    _pools().clear()
+    with _schema_lock:
+        _SCHEMA_READY.clear()
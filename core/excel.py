@@ -1,19 +1,24 @@
 from __future__ import annotations
 
+import multiprocessing
 import os
 import shutil
-import tempfile
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, PatternFill, Protection
+from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.datavalidation import DataValidation
 
 from config import AppConfig
-from core import db
+from core import db, db_pool
+from core.fast_xlsx import FastXlsxWriter
 from core.logger import get_logger
 from core.sla import (
     STATUS_MODEL,
@@ -42,7 +47,31 @@ STATUS_COLORS: Dict[str, str] = {
     "otip": "FCE4D6",
 }
 
+# Shared style objects: openpyxl registers a style per distinct object, so
+# reusing one instance keeps the style table (and save time) small.
+HEADER_FONT = Font(bold=True)
+REFERENCE_HEADER_COLOR = "E2EFDA"
+TICKET_HEADER_COLOR = "D9E1F2"
+REFERENCE_HEADER_FILL = PatternFill(
+    start_color=REFERENCE_HEADER_COLOR,
+    end_color=REFERENCE_HEADER_COLOR,
+    fill_type="solid",
+)
+TICKET_HEADER_FILL = PatternFill(
+    start_color=TICKET_HEADER_COLOR, end_color=TICKET_HEADER_COLOR, fill_type="solid"
+)
+# Cells are locked by default, so only editable columns need a protection.
+_PROT_UNLOCKED = Protection(locked=False)
+_STATUS_FILLS: Dict[str, PatternFill] = {
+    code: PatternFill(start_color=color, end_color=color, fill_type="solid")
+    for code, color in STATUS_COLORS.items()
+}
+
 PRIORITY_LIST = ["p1", "p2", "p3", "p4"]
+# Exact code <-> label lookups for the canonical statuses; the sla helpers
+# (aliases, fuzzy text) are only consulted on a miss.
+_CODE_TO_LABEL = {code: status_code_to_label(code) for code, _ in STATUS_MODEL}
+_LABEL_TO_CODE = {label: code for code, label in _CODE_TO_LABEL.items()}
 DEFAULT_STATUS_LIST = [code for code, _ in STATUS_MODEL]
 
 COLUMN_WIDTHS = {
@@ -83,6 +112,10 @@ WRAP_COLUMNS = {
     "Тема/группа",
 }
 
+# Columns users may edit on the protected ticket sheets.
+EDITABLE_COLUMNS = {"Статус", "Ответственный", "Комментарий", "Приоритет"}
+HIDDEN_COLUMNS = ("ticket_id", "stable_id", "row_version")
+
 RUS_COLUMNS = [
     ("ticket_id", "ticket_id"),
     ("stable_id", "stable_id"),
@@ -124,6 +157,10 @@ LEGACY_COL_ALIASES = {
 }
 
 
+def _label(code: str) -> str:
+    return _CODE_TO_LABEL.get(code) or status_code_to_label(code)
+
+
 def _header(df: pd.DataFrame, name: str) -> Optional[str]:
     if name in df.columns:
         return name
@@ -140,219 +177,445 @@ def _resolve_excel_password(cfg: AppConfig) -> str:
 def export_excel(
     cfg: AppConfig, today_only: bool = False, conflicts: Optional[List[Dict]] = None
 ) -> Path:
-    db.ensure_schema(cfg)
-    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
     where = ""
     params: Tuple = ()
     if today_only:
         where = "date(first_received_utc)=date('now','localtime')"
-    rows = db.fetch_tickets(conn, where, params)
-    conn.close()
+    with db_pool.get_conn(cfg) as conn:
+        rows = db.fetch_tickets_full(conn, where, params, raw=True)
 
     if not rows:
         log.info("No tickets to export, creating empty workbook with headers")
         df = pd.DataFrame(columns=[col for _, col in RUS_COLUMNS])
+        overdue_df = df
     else:
-        records = []
-        for r in rows:
-            received = r["first_received_utc"]
-            due = None
-            if r["priority"]:
-                try:
-                    prio_cfg = cfg.sla_by_priority.get(r["priority"], {})
-                    hours = float(
-                        prio_cfg.get("resolution_hours", cfg.overdue_days * 24)
-                    )
-                    due = datetime.fromisoformat(received) + timedelta(hours=hours)
-                except Exception:
-                    due = None
-            records.append(
-                {
-                    "ticket_id": r["id"],
-                    "stable_id": r["stable_id"],
-                    "row_version": r["row_version"],
-                    "id_display": r["id"],
-                    "first_received_utc": received,
-                    "subject": r["subject"],
-                    "sender": r["sender"],
-                    "customer_email": r["customer_email"] or "",
-                    "body": r["body"],
-                    "status": status_code_to_label(r["status"]),
-                    "responsible": r["responsible"] or "",
-                    "first_reply_utc": r["first_reply_utc"],
-                    "first_reply_body": r["first_reply_body"],
-                    "first_forward_to": r["first_forward_to"],
-                    "sla_due": due.isoformat() if due else "",
-                    "overdue": "Да" if r["overdue"] else "Нет",
-                    "comment": r["comment"] or "",
-                    "recommended_answer": r["recommended_answer"] or "",
-                    "repeat_hint": r["repeat_hint"] or "",
-                    "priority": r["priority"] or "",
-                    "topic": r["topic"] or "",
-                    "last_updated_at": r["last_updated_at"],
-                    "last_updated_by": r["last_updated_by"],
-                    "data_source": r["data_source"],
-                }
-            )
-        df = pd.DataFrame(records, columns=[key for key, _ in RUS_COLUMNS])
-        df.columns = [col for _, col in RUS_COLUMNS]
+        src = pd.DataFrame(rows, columns=db.TICKET_COLUMNS)
+        df = _ticket_frame(src, cfg)
+        # Select on the stored flag rather than re-comparing the label column.
+        overdue_df = df.loc[src["overdue"].astype(bool).to_numpy()]
 
     status_list_raw = cfg.status_catalog or DEFAULT_STATUS_LIST
     status_list = [normalize_status_code(s) or s for s in status_list_raw]
 
-    with tempfile.NamedTemporaryFile(
-        prefix="tickets_", suffix=".xlsx", delete=False
-    ) as tmp:
-        tmp_path = Path(tmp.name)
-    with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name=SHEET_TICKETS, index=False)
-        overdue_df = (
-            df[df["Просрочка"] == "Да"]
-            if not df.empty
-            else pd.DataFrame(columns=df.columns)
-        )
-        overdue_df.to_excel(writer, sheet_name=SHEET_OVERDUE, index=False)
-        kpi_rows = _build_kpi(df)
-        pd.DataFrame(kpi_rows, columns=["Показатель", "Значение"]).to_excel(
-            writer, sheet_name=SHEET_KPI, index=False
-        )
-        conflicts_df = pd.DataFrame(
-            conflicts or [], columns=["ticket_id", "поле", "excel", "db", "решение"]
-        )
-        conflicts_df.to_excel(writer, sheet_name=SHEET_CONFLICTS, index=False)
-        hints = []
-        for st in status_list:
-            hints.append(
-                {
-                    "Статус": status_code_to_label(st),
-                    "Подсказка": cfg.status_hints.get(st, ""),
-                }
-            )
-        pd.DataFrame(hints).to_excel(writer, sheet_name=SHEET_STATUS_HELP, index=False)
-
-    _decorate_excel(
-        tmp_path, status_list=status_list, password=_resolve_excel_password(cfg)
+    dst = Path(cfg.paths.excel_path)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    # Same directory as dst, so the final rename never crosses filesystems.
+    tmp_path = dst.with_name(f".{dst.stem}.{os.getpid()}.tmp.xlsx")
+    password = _resolve_excel_password(cfg) or "naos"
+    kpi_df = pd.DataFrame(_build_kpi(df), columns=["Показатель", "Значение"])
+    conflicts_df = pd.DataFrame(
+        conflicts or [], columns=["ticket_id", "поле", "excel", "db", "решение"]
     )
-    final_path = _atomic_replace(tmp_path, cfg.paths.excel_path)
+    hints = []
+    for st in status_list:
+        hints.append(
+            {
+                "Статус": _label(st),
+                "Подсказка": cfg.status_hints.get(st, ""),
+            }
+        )
+    hints_df = pd.DataFrame(hints, columns=["Статус", "Подсказка"])
+    frames = (df, overdue_df, kpi_df, conflicts_df, hints_df)
+    try:
+        if cfg.fast_xlsx and len(df) >= cfg.fast_xlsx_min_rows:
+            _write_fast_workbook(tmp_path, *frames, status_list, password)
+        else:
+            _write_openpyxl_workbook(tmp_path, *frames, status_list, password)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    final_path = _atomic_replace(tmp_path, dst)
     log.info("Excel exported to %s", final_path)
     return final_path
 
 
-def _decorate_excel(
-    path: Path, status_list: Optional[List[str]] = None, password: str = "naos"
+def _write_openpyxl_workbook(
+    path: Path,
+    df: pd.DataFrame,
+    overdue_df: pd.DataFrame,
+    kpi_df: pd.DataFrame,
+    conflicts_df: pd.DataFrame,
+    hints_df: pd.DataFrame,
+    status_list: List[str],
+    password: str,
 ) -> None:
-    status_list = [
-        normalize_status_code(s) or s for s in (status_list or DEFAULT_STATUS_LIST)
-    ]
-    wb = load_workbook(path)
-    editable_headers = {"Статус", "Ответственный", "Комментарий", "Приоритет"}
-    for sheet_name in (SHEET_TICKETS, SHEET_OVERDUE):
-        if sheet_name not in wb.sheetnames:
-            continue
-        ws = wb[sheet_name]
-        header_font = Font(bold=True)
-        header_fill = PatternFill(
-            start_color="D9E1F2", end_color="D9E1F2", fill_type="solid"
+    wb = Workbook(write_only=True)
+    _write_ticket_sheet(wb, SHEET_TICKETS, df, status_list, password)
+    _write_ticket_sheet(wb, SHEET_OVERDUE, overdue_df, status_list, password)
+    _write_frame(
+        wb,
+        SHEET_KPI,
+        kpi_df,
+        header_fill=REFERENCE_HEADER_FILL,
+        header_alignment=Alignment(horizontal="center", vertical="center"),
+        freeze=True,
+    )
+    _write_frame(wb, SHEET_CONFLICTS, conflicts_df, autosize=False)
+    _write_frame(wb, SHEET_STATUS_HELP, hints_df, header_fill=REFERENCE_HEADER_FILL)
+    wb.save(path)
+
+
+def _write_fast_workbook(
+    path: Path,
+    df: pd.DataFrame,
+    overdue_df: pd.DataFrame,
+    kpi_df: pd.DataFrame,
+    conflicts_df: pd.DataFrame,
+    hints_df: pd.DataFrame,
+    status_list: List[str],
+    password: str,
+) -> None:
+    """Same workbook as _write_openpyxl_workbook, via the streaming writer."""
+    with FastXlsxWriter(path) as writer:
+        for name, frame in ((SHEET_TICKETS, df), (SHEET_OVERDUE, overdue_df)):
+            _write_fast_ticket_sheet(writer, name, frame, status_list, password)
+        kpi_header = writer.style(
+            bold=True,
+            fill=REFERENCE_HEADER_COLOR,
+            horizontal="center",
+            vertical="center",
         )
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(
-                horizontal="center", vertical="center", wrap_text=True
-            )
-        ws.freeze_panes = "A2"
-        ws.auto_filter.ref = ws.dimensions
-
-        header_names = [cell.value for cell in ws[1]]
-        for col in ws.columns:
-            col_letter = col[0].column_letter
-            header_val = col[0].value
-            target_width = COLUMN_WIDTHS.get(header_val, DEFAULT_COL_WIDTH)
-            ws.column_dimensions[col_letter].width = target_width
-            if header_val in WRAP_COLUMNS:
-                for cell in col:
-                    cell.alignment = Alignment(wrap_text=True, vertical="top")
-
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-            if "Статус" in header_names:
-                status_idx = header_names.index("Статус")
-                status_val = (row[status_idx].value or "").strip()
-                code = status_text_to_code(status_val)
-                color = STATUS_COLORS.get(code or status_val)
-                if color:
-                    fill = PatternFill(
-                        start_color=color, end_color=color, fill_type="solid"
-                    )
-                    for cell in row:
-                        cell.fill = fill
-            for cell in row:
-                header = header_names[cell.column - 1]
-                cell.protection = Protection(locked=header not in editable_headers)
-
-        for col_name in ("ticket_id", "stable_id", "row_version"):
-            if col_name in header_names:
-                idx = header_names.index(col_name)
-                col_letter = ws[1][idx].column_letter
-                ws.column_dimensions[col_letter].hidden = True
-
-        if "Статус" in header_names:
-            status_idx = header_names.index("Статус") + 1
-            labels = [status_code_to_label(s) for s in status_list]
-            dv_status = DataValidation(
-                type="list", formula1=f'"{",".join(labels)}"', allow_blank=True
-            )
-            dv_status.errorTitle = "Неверный статус"
-            dv_status.error = "Выберите статус из выпадающего списка."
-            ws.add_data_validation(dv_status)
-            dv_status.add(
-                f"{ws.cell(row=2, column=status_idx).coordinate}:{ws.cell(row=1000, column=status_idx).coordinate}"
-            )
-        if "Приоритет" in header_names:
-            prio_idx = header_names.index("Приоритет") + 1
-            dv_prio = DataValidation(
-                type="list", formula1=f'"{",".join(PRIORITY_LIST)}"', allow_blank=True
+        writer.add_sheet(
+            SHEET_KPI,
+            list(kpi_df.columns),
+            _frame_rows(kpi_df),
+            header_styles=[kpi_header] * len(kpi_df.columns),
+            widths=_autosize_widths(kpi_df),
+            freeze=True,
+        )
+        bold = writer.style(bold=True)
+        writer.add_sheet(
+            SHEET_CONFLICTS,
+            list(conflicts_df.columns),
+            _frame_rows(conflicts_df),
+            header_styles=[bold] * len(conflicts_df.columns),
+        )
+        hints_header = writer.style(bold=True, fill=REFERENCE_HEADER_COLOR)
+        writer.add_sheet(
+            SHEET_STATUS_HELP,
+            list(hints_df.columns),
+            _frame_rows(hints_df),
+            header_styles=[hints_header] * len(hints_df.columns),
+            widths=_autosize_widths(hints_df),
+        )
+
+
+def _write_fast_ticket_sheet(
+    writer: FastXlsxWriter,
+    sheet_name: str,
+    df: pd.DataFrame,
+    status_list: List[str],
+    password: str,
+) -> None:
+    header_names = list(df.columns)
+    wrap_cols = [name in WRAP_COLUMNS for name in header_names]
+    header_styles = [
+        writer.style(
+            bold=True,
+            fill=TICKET_HEADER_COLOR,
+            horizontal=None if wrap else "center",
+            vertical="top" if wrap else "center",
+            wrap=True,
+        )
+        for wrap in wrap_cols
+    ]
+
+    def column_styles(color: Optional[str]) -> List[int]:
+        return [
+            writer.style(
+                fill=color,
+                locked=name not in EDITABLE_COLUMNS,
+                vertical="top" if wrap else None,
+                wrap=wrap,
             )
-            dv_prio.errorTitle = "Неверный приоритет"
-            dv_prio.error = "Используйте p1/p2/p3/p4."
-            ws.add_data_validation(dv_prio)
-            dv_prio.add(
-                f"{ws.cell(row=2, column=prio_idx).coordinate}:{ws.cell(row=1000, column=prio_idx).coordinate}"
+            for name, wrap in zip(header_names, wrap_cols)
+        ]
+
+    status_idx = header_names.index("Статус") if "Статус" in header_names else -1
+    styles_by_color = {color: column_styles(color) for color in STATUS_COLORS.values()}
+    styles_by_color[None] = column_styles(None)
+    styles_by_status: Dict[str, List[int]] = {}
+
+    def row_styles(values) -> List[int]:
+        if status_idx < 0:
+            return styles_by_color[None]
+        status_val = values[status_idx] or ""
+        styles = styles_by_status.get(status_val)
+        if styles is None:
+            color = STATUS_COLORS.get(_status_key(status_val))
+            styles = styles_by_status[status_val] = styles_by_color[color]
+        return styles
+
+    writer.add_sheet(
+        sheet_name,
+        header_names,
+        _frame_rows(df),
+        header_styles=header_styles,
+        row_styles=row_styles,
+        widths=[COLUMN_WIDTHS.get(name, DEFAULT_COL_WIDTH) for name in header_names],
+        hidden=[i for i, name in enumerate(header_names) if name in HIDDEN_COLUMNS],
+        freeze=True,
+        auto_filter=True,
+        validations=_ticket_validations(header_names, status_list),
+        password=password,
+    )
+
+
+_export_executor: Optional[ProcessPoolExecutor] = None
+_export_executor_lock = threading.Lock()
+
+
+def _get_export_executor() -> ProcessPoolExecutor:
+    global _export_executor
+    with _export_executor_lock:
+        if _export_executor is None:
+            # spawn: the parent may hold Outlook COM state that must not fork.
+            _export_executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
             )
+        return _export_executor
 
-        ws.protection.sheet = True
-        ws.protection.password = password or "naos"
-        ws.protection.enable()
 
-    if SHEET_KPI in wb.sheetnames:
-        ws_kpi = wb[SHEET_KPI]
-        ws_kpi.freeze_panes = "A2"
-        header_font = Font(bold=True)
-        header_fill = PatternFill(
-            start_color="E2EFDA", end_color="E2EFDA", fill_type="solid"
-        )
-        for cell in ws_kpi[1]:
-            cell.font = header_font
+def export_excel_async(
+    cfg: AppConfig, today_only: bool = False, conflicts: Optional[List[Dict]] = None
+) -> Future:
+    """Run export_excel in a single background worker process.
+
+    Returns a Future resolving to the exported path; exports are serialized.
+    The worker does not configure logging, so completion is logged here.
+    """
+    future = _get_export_executor().submit(export_excel, cfg, today_only, conflicts)
+
+    def _log_result(done: Future) -> None:
+        if done.cancelled():
+            return
+        exc = done.exception()
+        if exc is not None:
+            log.error("Background Excel export failed: %s", exc)
+        else:
+            log.info("Background Excel export finished: %s", done.result())
+
+    future.add_done_callback(_log_result)
+    return future
+
+
+def shutdown_export_executor(wait: bool = True) -> None:
+    global _export_executor
+    with _export_executor_lock:
+        if _export_executor is not None:
+            _export_executor.shutdown(wait=wait)
+            _export_executor = None
+
+
+def _ticket_frame(src: pd.DataFrame, cfg: AppConfig) -> pd.DataFrame:
+    """Map raw ticket columns to the export layout, column-wise."""
+    received = src["first_received_utc"]
+    offsets = _due_offsets(cfg, src["priority"].dropna().unique())
+    due = pd.to_datetime(received, errors="coerce", format="ISO8601") + pd.to_timedelta(
+        src["priority"].map(offsets)
+    )
+    labels = {code: _label(code) for code in src["status"].unique()}
+    out = {
+        "ticket_id": src["id"],
+        "stable_id": src["stable_id"],
+        "row_version": src["row_version"],
+        "id_display": src["id"],
+        "first_received_utc": received,
+        "subject": src["subject"],
+        "sender": src["sender"],
+        "customer_email": src["customer_email"].fillna(""),
+        "body": src["body"],
+        "status": src["status"].map(labels),
+        "responsible": src["responsible"].fillna(""),
+        "first_reply_utc": src["first_reply_utc"],
+        "first_reply_body": src["first_reply_body"],
+        "first_forward_to": src["first_forward_to"],
+        "sla_due": due.dt.strftime("%Y-%m-%dT%H:%M:%S").fillna(""),
+        "overdue": src["overdue"].astype(bool).map({True: "Да", False: "Нет"}),
+        "comment": src["comment"].fillna(""),
+        "recommended_answer": src["recommended_answer"].fillna(""),
+        "repeat_hint": src["repeat_hint"].fillna(""),
+        "priority": src["priority"].fillna(""),
+        "topic": src["topic"].fillna(""),
+        "last_updated_at": src["last_updated_at"],
+        "last_updated_by": src["last_updated_by"],
+        "data_source": src["data_source"],
+    }
+    df = pd.DataFrame({key: out[key] for key, _ in RUS_COLUMNS})
+    df.columns = [col for _, col in RUS_COLUMNS]
+    return df
+
+
+def _due_offsets(cfg: AppConfig, priorities: Iterable[str]) -> Dict[str, timedelta]:
+    """Resolution window per priority; blank priorities get no SLA due date."""
+    default_hours = cfg.overdue_days * 24
+    offsets: Dict[str, timedelta] = {}
+    for prio in priorities:
+        if not prio:
+            continue
+        try:
+            prio_cfg = cfg.sla_by_priority.get(prio, {})
+            hours = float(prio_cfg.get("resolution_hours", default_hours))
+        except Exception:
+            continue
+        offsets[prio] = timedelta(hours=hours)
+    return offsets
+
+
+def _frame_rows(df: pd.DataFrame):
+    # NaN/NaT would be written as literal numbers; Excel expects empty cells.
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def _write_frame(
+    wb: Workbook,
+    sheet_name: str,
+    df: pd.DataFrame,
+    header_fill: Optional[PatternFill] = None,
+    header_alignment: Optional[Alignment] = None,
+    freeze: bool = False,
+    autosize: bool = True,
+) -> None:
+    """Stream df into a new write-only sheet with a styled header row."""
+    ws = wb.create_sheet(sheet_name)
+    if freeze:
+        ws.freeze_panes = "A2"
+    if autosize:
+        # Write-only sheets emit column widths before the rows.
+        for idx, width in enumerate(_autosize_widths(df), start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = width
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        if header_fill is not None:
             cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        for col in ws_kpi.columns:
-            max_length = max(len(str(cell.value or "")) for cell in col)
-            col_letter = col[0].column_letter
-            ws_kpi.column_dimensions[col_letter].width = min(max_length + 4, 60)
-    if SHEET_STATUS_HELP in wb.sheetnames:
-        ws_ref = wb[SHEET_STATUS_HELP]
-        header_font = Font(bold=True)
-        header_fill = PatternFill(
-            start_color="E2EFDA", end_color="E2EFDA", fill_type="solid"
+        if header_alignment is not None:
+            cell.alignment = header_alignment
+        header.append(cell)
+    ws.append(header)
+    for row in _frame_rows(df):
+        ws.append(row)
+
+
+def _autosize_widths(df: pd.DataFrame) -> List[int]:
+    """Widths fitting the longest header or cell text, capped at 60."""
+    widths = [len(str(name)) for name in df.columns]
+    if not df.empty:
+        longest = df.fillna("").astype(str).apply(lambda col: col.str.len().max())
+        widths = [max(w, int(n)) for w, n in zip(widths, longest)]
+    return [min(w + 4, 60) for w in widths]
+
+
+def _write_ticket_sheet(
+    wb: Workbook,
+    sheet_name: str,
+    df: pd.DataFrame,
+    status_list: List[str],
+    password: str = "naos",
+) -> None:
+    """Write a ticket sheet fully decorated in one pass.
+
+    Write-only sheets take layout, validation and protection up front and
+    cells carry their own style, so the file is never reopened.
+    """
+    ws = wb.create_sheet(sheet_name)
+    header_names = list(df.columns)
+    last_col = get_column_letter(max(len(header_names), 1))
+    ws.freeze_panes = "A2"
+    ws.auto_filter.ref = f"A1:{last_col}{len(df) + 1}"
+    for idx, header_val in enumerate(header_names, start=1):
+        col_letter = get_column_letter(idx)
+        dim = ws.column_dimensions[col_letter]
+        dim.width = COLUMN_WIDTHS.get(header_val, DEFAULT_COL_WIDTH)
+        if header_val in HIDDEN_COLUMNS:
+            dim.hidden = True
+
+    for dv in _ticket_validations(header_names, status_list):
+        ws.data_validations.append(dv)
+
+    ws.protection.sheet = True
+    ws.protection.password = password or "naos"
+    ws.protection.enable()
+
+    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    wrap_align = Alignment(wrap_text=True, vertical="top")
+    header = []
+    for name in header_names:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        cell.fill = TICKET_HEADER_FILL
+        cell.alignment = wrap_align if name in WRAP_COLUMNS else header_align
+        header.append(cell)
+    ws.append(header)
+
+    status_idx = header_names.index("Статус") if "Статус" in header_names else -1
+    col_styles = [
+        (
+            _PROT_UNLOCKED if name in EDITABLE_COLUMNS else None,
+            wrap_align if name in WRAP_COLUMNS else None,
         )
-        for cell in ws_ref[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-        for col in ws_ref.columns:
-            max_length = max(len(str(cell.value or "")) for cell in col)
-            col_letter = col[0].column_letter
-            ws_ref.column_dimensions[col_letter].width = min(max_length + 4, 60)
-
-    wb.save(path)
+        for name in header_names
+    ]
+    fill_by_status: Dict[str, Optional[PatternFill]] = {}
+    for values in _frame_rows(df):
+        fill = None
+        if status_idx >= 0:
+            status_val = values[status_idx] or ""
+            if status_val in fill_by_status:
+                fill = fill_by_status[status_val]
+            else:
+                fill = _STATUS_FILLS.get(_status_key(status_val))
+                fill_by_status[status_val] = fill
+        cells = []
+        for value, (protection, alignment) in zip(values, col_styles):
+            if fill is None and protection is None and alignment is None:
+                # Plain values reuse the writer's scratch cell.
+                cells.append(value)
+                continue
+            cell = WriteOnlyCell(ws, value=value)
+            if protection is not None:
+                cell.protection = protection
+            if alignment is not None:
+                cell.alignment = alignment
+            if fill is not None:
+                cell.fill = fill
+            cells.append(cell)
+        ws.append(cells)
+
+
+def _status_key(status_val: str) -> str:
+    """STATUS_COLORS key for a status cell: its code, else the raw text."""
+    text = (status_val or "").strip()
+    return _LABEL_TO_CODE.get(text) or status_text_to_code(text) or text
+
+
+def _ticket_validations(
+    header_names: List[str], status_list: List[str]
+) -> List[DataValidation]:
+    validations = []
+    if "Статус" in header_names:
+        status_letter = get_column_letter(header_names.index("Статус") + 1)
+        labels = [_label(s) for s in status_list]
+        dv_status = DataValidation(
+            type="list", formula1=f'"{",".join(labels)}"', allow_blank=True
+        )
+        dv_status.errorTitle = "Неверный статус"
+        dv_status.error = "Выберите статус из выпадающего списка."
+        dv_status.add(f"{status_letter}2:{status_letter}1000")
+        validations.append(dv_status)
+    if "Приоритет" in header_names:
+        prio_letter = get_column_letter(header_names.index("Приоритет") + 1)
+        dv_prio = DataValidation(
+            type="list", formula1=f'"{",".join(PRIORITY_LIST)}"', allow_blank=True
+        )
+        dv_prio.errorTitle = "Неверный приоритет"
+        dv_prio.error = "Используйте p1/p2/p3/p4."
+        dv_prio.add(f"{prio_letter}2:{prio_letter}1000")
+        validations.append(dv_prio)
+    return validations
 
 
 def _atomic_replace(src: Path, dst: Path) -> Path:
@@ -361,7 +624,7 @@ def _atomic_replace(src: Path, dst: Path) -> Path:
     if dst.exists():
         backup = dst.with_suffix(".bak")
         try:
-            shutil.copy2(dst, backup)
+            _link_or_copy(dst, backup)
         except Exception as exc:
             log.warning("Backup failed: %s", exc)
     try:
@@ -384,20 +647,30 @@ def _atomic_replace(src: Path, dst: Path) -> Path:
                 pass
 
 
+def _link_or_copy(src: Path, dst: Path) -> None:
+    # dst is replaced by rename, never rewritten in place, so a hard link
+    # keeps the previous contents without copying the file.
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
 def _read_ticket_sheet(path: Path) -> pd.DataFrame:
-    xls = pd.ExcelFile(path)
-    candidates = [SHEET_TICKETS, "Tickets"] + list(xls.sheet_names)
-    for name in candidates:
-        if name in xls.sheet_names:
-            try:
-                return pd.read_excel(path, sheet_name=name)
-            except Exception:
-                continue
+    # One open for both sheet discovery and parsing.
+    with pd.ExcelFile(path, engine="openpyxl") as xls:
+        candidates = [SHEET_TICKETS, "Tickets"] + list(xls.sheet_names)
+        for name in candidates:
+            if name in xls.sheet_names:
+                try:
+                    return xls.parse(sheet_name=name)
+                except Exception:
+                    continue
     raise ValueError("Не удалось найти лист с заявками")
 
 
 def sync_from_excel(cfg: AppConfig) -> Dict[str, int]:
-    db.ensure_schema(cfg)
     path = cfg.paths.excel_path
     if not path.exists():
         log.info("Excel file not found, skip sync")
@@ -417,108 +690,114 @@ def sync_from_excel(cfg: AppConfig) -> Dict[str, int]:
         log.error("Excel missing required columns")
         return {"updated": 0, "conflicts": 0, "missing": 0}
 
-    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-    updated = conflicts = missing = 0
+    ticket_ids = pd.to_numeric(df["ticket_id"], errors="coerce")
+    excel_rvs = pd.to_numeric(df["row_version"], errors="coerce")
+    valid = ticket_ids.notna() & excel_rvs.notna()
+    status_display = _text_column(df, status_col)[valid]
+    status_codes = {
+        text: _LABEL_TO_CODE.get(text) or status_text_to_code(text) or text or None
+        for text in status_display.unique()
+    }
+    work = pd.DataFrame(
+        {
+            "ticket_id": ticket_ids[valid].astype(int),
+            "excel_rv": excel_rvs[valid].astype(int),
+            "status": status_display.map(status_codes),
+            "responsible": _text_column(df, resp_col)[valid],
+            "priority": _text_column(df, prio_col)[valid],
+            "comment": _text_column(df, comment_col)[valid],
+            "excel_updated_at": _text_column(df, "Обновлено")[valid],
+        }
+    )
+    work["excel_updated_dt"] = pd.to_datetime(
+        work["excel_updated_at"], errors="coerce", format="ISO8601"
+    )
+
     conflict_rows: List[Dict] = []
-    try:
-        for _, row in df.iterrows():
-            try:
-                ticket_id = int(row["ticket_id"])
-            except Exception:
-                continue
-            excel_rv = int(row["row_version"])
-            status_display = str(row.get(status_col, "")).strip()
-            status = status_text_to_code(status_display) or status_display
-            responsible = str(row.get(resp_col, "") or "").strip()
-            priority = str(row.get(prio_col, "") or "").strip()
-            comment = str(row.get(comment_col, "") or "").strip()
-            excel_updated_at = str(row.get("Обновлено", "") or "").strip()
-            excel_updated_dt = None
-            try:
-                excel_updated_dt = datetime.fromisoformat(excel_updated_at)
-            except Exception:
-                excel_updated_dt = None
-            cur = conn.execute(
-                "SELECT row_version, last_updated_at FROM tickets WHERE id=?",
-                (ticket_id,),
+    with db_pool.get_conn(cfg) as conn:
+        # Read, classify and write under one IMMEDIATE lock, so a concurrent
+        # writer cannot bump row_version between the check and the UPDATE.
+        with db.write_transaction(conn):
+            current = _fetch_sync_state(conn, work["ticket_id"].unique().tolist())
+            db_rv = work["ticket_id"].map({tid: rv for tid, (rv, _) in current.items()})
+            db_updated = work["ticket_id"].map(
+                {tid: upd for tid, (_, upd) in current.items()}
             )
-            current = cur.fetchone()
-            if not current:
-                missing += 1
-                continue
-            db_updated = current["last_updated_at"]
-            db_updated_dt = None
-            try:
-                db_updated_dt = (
-                    datetime.fromisoformat(db_updated) if db_updated else None
-                )
-            except Exception:
-                db_updated_dt = None
-
-            if db_updated_dt and excel_updated_dt and db_updated_dt > excel_updated_dt:
-                conflicts += 1
-                conflict_rows.append(
-                    {
-                        "ticket_id": ticket_id,
-                        "поле": "last_updated_at",
-                        "excel": excel_updated_at,
-                        "db": db_updated,
-                        "решение": "skip (db newer)",
-                    }
-                )
-                db.log_event(
-                    conn,
-                    ticket_id,
-                    "excel_conflict",
-                    None,
-                    status,
-                    "excel",
-                    raw_response="db newer",
-                )
-                continue
-            if int(current["row_version"]) != excel_rv:
-                conflicts += 1
-                conflict_rows.append(
-                    {
-                        "ticket_id": ticket_id,
-                        "поле": "row_version",
-                        "excel": excel_rv,
-                        "db": current["row_version"],
-                        "решение": "skip",
-                    }
+            db_updated_dt = pd.to_datetime(
+                db_updated, errors="coerce", format="ISO8601"
+            )
+            is_missing = db_rv.isna()
+            db_newer = ~is_missing & (db_updated_dt > work["excel_updated_dt"])
+            # A repeated ticket_id only applies once; later copies see a bumped
+            # row_version, as they did when rows were synced one at a time.
+            rv_conflict = (
+                ~is_missing
+                & ~db_newer
+                & ((db_rv != work["excel_rv"]) | work["ticket_id"].duplicated())
+            )
+            to_update = ~is_missing & ~db_newer & ~rv_conflict
+
+            events = []
+            for row, newer, rv in zip(
+                work[db_newer | rv_conflict].itertuples(index=False),
+                db_newer[db_newer | rv_conflict],
+                db_rv[db_newer | rv_conflict],
+            ):
+                if newer:
+                    conflict_rows.append(
+                        {
+                            "ticket_id": row.ticket_id,
+                            "поле": "last_updated_at",
+                            "excel": row.excel_updated_at,
+                            "db": current[row.ticket_id][1],
+                            "решение": "skip (db newer)",
+                        }
+                    )
+                    reason = "db newer"
+                else:
+                    conflict_rows.append(
+                        {
+                            "ticket_id": row.ticket_id,
+                            "поле": "row_version",
+                            "excel": row.excel_rv,
+                            "db": int(rv),
+                            "решение": "skip",
+                        }
+                    )
+                    reason = "row_version mismatch"
+                events.append(
+                    (
+                        row.ticket_id,
+                        "excel_conflict",
+                        None,
+                        row.status,
+                        "excel",
+                        reason,
+                        None,
+                    )
                 )
-                db.log_event(
-                    conn,
-                    ticket_id,
-                    "excel_conflict",
-                    None,
-                    status,
-                    "excel",
-                    raw_response="row_version mismatch",
+
+            ok = work[to_update]
+            updates = [
+                (status, resp or None, prio or None, comment or None, status, tid, rv)
+                for status, resp, prio, comment, tid, rv in zip(
+                    ok["status"],
+                    ok["responsible"],
+                    ok["priority"],
+                    ok["comment"],
+                    ok["ticket_id"].tolist(),
+                    ok["excel_rv"].tolist(),
                 )
-                continue
-            conn.execute(
-                """
-                UPDATE tickets
-                SET status=?, responsible=?, priority=?, comment=?, overdue=CASE WHEN ? IN ('resolved','table','in_table','not_interesting') THEN 0 ELSE overdue END,
-                    row_version=row_version+1, last_status_utc=datetime('now'), last_updated_at=datetime('now'), last_updated_by='excel', data_source='excel'
-                WHERE id=? AND row_version=?
-                """,
-                (
-                    status,
-                    responsible or None,
-                    priority or None,
-                    comment or None,
-                    status,
-                    ticket_id,
-                    excel_rv,
-                ),
+            ]
+            conn.executemany(_SQL_SYNC_UPDATE, updates)
+            events.extend(
+                (tid, "excel_sync", None, status, "excel", None, None)
+                for status, _, _, _, _, tid, _ in updates
             )
-            db.log_event(conn, ticket_id, "excel_sync", None, status, "excel")
-            updated += 1
-        conn.commit()
-    finally:
-        conn.close()
+            db.log_events(conn, events)
+    updated = len(updates)
+    conflicts = len(conflict_rows)
+    missing = int(is_missing.sum())
     log.info(
         "Excel sync completed: %s updated, %s conflicts, %s missing",
         updated,
@@ -533,21 +812,56 @@ def sync_from_excel(cfg: AppConfig) -> Dict[str, int]:
     }
 
 
+# Empty status cells keep the stored status instead of overwriting it.
+_SQL_SYNC_UPDATE = f"""
+    UPDATE tickets
+    SET status=COALESCE(?, status), responsible=?, priority=?, comment=?, flags=CASE WHEN ? IN ('resolved','table','in_table','not_interesting') THEN flags & ~{db.FLAG_OVERDUE} ELSE flags END,
+        row_version=row_version+1, last_status_utc=datetime('now'), last_updated_at=datetime('now'), last_updated_by='excel', data_source='excel'
+    WHERE id=? AND row_version=?
+    """
+# Ids per IN (...) lookup, under SQLite's historical 999-variable limit.
+_SYNC_LOOKUP_CHUNK = 900
+
+
+def _text_column(df: pd.DataFrame, name: Optional[str]) -> pd.Series:
+    """Stripped text for a sheet column; blank cells and absent columns -> ''."""
+    if name is None or name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[name].astype(object).where(df[name].notna(), "").map(str).str.strip()
+
+
+def _fetch_sync_state(
+    conn, ticket_ids: List[int]
+) -> Dict[int, Tuple[int, Optional[str]]]:
+    state: Dict[int, Tuple[int, Optional[str]]] = {}
+    for start in range(0, len(ticket_ids), _SYNC_LOOKUP_CHUNK):
+        chunk = ticket_ids[start : start + _SYNC_LOOKUP_CHUNK]
+        rows = conn.execute(
+            "SELECT id, row_version, last_updated_at FROM tickets "
+            f"WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        for tid, rv, updated_at in rows:
+            state[tid] = (int(rv), updated_at)
+    return state
+
+
 def _build_kpi(df: pd.DataFrame) -> List[Tuple[str, object]]:
     rows: List[Tuple[str, object]] = []
     total = len(df)
-    overdue = int((df["Просрочка"] == "Да").sum()) if not df.empty else 0
+    overdue = int((df["Просрочка"].to_numpy() == "Да").sum()) if total else 0
     rows.append(("Всего заявок", total))
     rows.append(("Просрочка", overdue))
     if total:
         rows.append(("Доля просрочек", f"{(overdue/total*100):.1f}%"))
-    for status in df.get("Статус", pd.Series(dtype=object)).unique():
-        if pd.isna(status):
-            continue
-        cnt = int((df["Статус"] == status).sum())
-        rows.append((f"Статус {status}", cnt))
-    if "Ответственный" in df.columns and not df.empty:
-        resp_counts = df["Ответственный"].fillna("").value_counts().head(5)
+    if "Статус" in df.columns:
+        # sort=False keeps first-seen order, matching the sheet's row order.
+        status_counts = df["Статус"].value_counts(sort=False, dropna=True)
+        for status, cnt in status_counts.items():
+            rows.append((f"Статус {status}", int(cnt)))
+    if "Ответственный" in df.columns and total:
+        # _ticket_frame already blanks missing responsibles.
+        resp_counts = df["Ответственный"].value_counts().head(5)
         for name, cnt in resp_counts.items():
             label = name or "<не задан>"
             rows.append((f"Топ ответственное лицо: {label}", int(cnt)))
@@ -0,0 +1,295 @@
+"""Streaming xlsx writer for large exports.
+
+Sheet XML is emitted row by row straight into the zip, so no per-cell
+objects are created. Only what the ticket export uses is supported:
+inline strings, numbers and booleans, a small style table (bold font,
+solid fill, alignment, locked flag), column widths, frozen header,
+autofilter, list validations and sheet protection.
+"""
+
+from __future__ import annotations
+
+import re
+import zipfile
+from numbers import Number
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.worksheet.protection import SheetProtection
+from openpyxl.xml.functions import tostring
+
+# Characters XML 1.0 cannot carry; openpyxl rejects them, we drop them.
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_StyleKey = Tuple[bool, Optional[str], bool, Optional[str], Optional[str], bool]
+
+_CONTENT_TYPES_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_REL = '<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/{kind}" Target="{target}"/>'
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+)
+_FROZEN_HEADER = (
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '<selection pane="bottomLeft" activeCell="A2" sqref="A2"/>'
+    "</sheetView></sheetViews>"
+)
+_PLAIN_VIEW = '<sheetViews><sheetView workbookViewId="0"/></sheetViews>'
+
+
+class FastXlsxWriter:
+    """Write a workbook sheet by sheet; use as a context manager.
+
+    Styles are registered with style() before the rows that use them and
+    referenced by the returned index; index 0 is the default locked style.
+    """
+
+    def __init__(self, path: Path, compresslevel: int = 1) -> None:
+        self._zip = zipfile.ZipFile(
+            path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+        )
+        self._sheets: List[Tuple[str, Optional[str]]] = []
+        self._fills: Dict[str, int] = {}
+        self._styles: Dict[_StyleKey, int] = {}
+        self.style()
+
+    def __enter__(self) -> "FastXlsxWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+
+    def style(
+        self,
+        bold: bool = False,
+        fill: Optional[str] = None,
+        locked: bool = True,
+        horizontal: Optional[str] = None,
+        vertical: Optional[str] = None,
+        wrap: bool = False,
+    ) -> int:
+        key = (bold, fill, locked, horizontal, vertical, wrap)
+        idx = self._styles.get(key)
+        if idx is None:
+            if fill is not None and fill not in self._fills:
+                # fillId 0/1 are the mandatory none/gray125 fills.
+                self._fills[fill] = len(self._fills) + 2
+            idx = self._styles[key] = len(self._styles)
+        return idx
+
+    def add_sheet(
+        self,
+        name: str,
+        header: Sequence[str],
+        rows: Iterable[Sequence],
+        header_styles: Optional[Sequence[int]] = None,
+        row_styles: Optional[Callable[[Sequence], Sequence[int]]] = None,
+        widths: Optional[Sequence[Optional[float]]] = None,
+        hidden: Iterable[int] = (),
+        freeze: bool = False,
+        auto_filter: bool = False,
+        validations: Sequence[DataValidation] = (),
+        password: Optional[str] = None,
+    ) -> None:
+        """Stream one sheet; row_styles maps a row to per-column style ids."""
+        n = len(self._sheets) + 1
+        letters = [get_column_letter(i) for i in range(1, max(len(header), 1) + 1)]
+        hidden = set(hidden)
+        with self._zip.open(f"xl/worksheets/sheet{n}.xml", "w") as fh:
+            write = fh.write
+            parts = [_SHEET_HEAD, _FROZEN_HEADER if freeze else _PLAIN_VIEW]
+            if widths or hidden:
+                parts.append("<cols>")
+                for idx in range(len(header)):
+                    width = widths[idx] if widths and idx < len(widths) else None
+                    if width is None and idx not in hidden:
+                        continue
+                    attrs = f' width="{width}" customWidth="1"' if width else ""
+                    if idx in hidden:
+                        attrs += ' hidden="1"'
+                    parts.append(f'<col min="{idx + 1}" max="{idx + 1}"{attrs}/>')
+                parts.append("</cols>")
+            parts.append("<sheetData>")
+            write("".join(parts).encode("utf-8"))
+            write(_row_xml(1, header, letters, header_styles).encode("utf-8"))
+            row_num = 1
+            for values in rows:
+                row_num += 1
+                styles = row_styles(values) if row_styles else None
+                write(_row_xml(row_num, values, letters, styles).encode("utf-8"))
+            tail = ["</sheetData>"]
+            if password is not None:
+                protection = SheetProtection(sheet=True, password=password)
+                tail.append(tostring(protection.to_tree()).decode("utf-8"))
+            filter_ref = f"A1:{letters[-1]}{row_num}"
+            if auto_filter:
+                tail.append(f'<autoFilter ref="{filter_ref}"/>')
+            if validations:
+                tail.append(f'<dataValidations count="{len(validations)}">')
+                tail.extend(
+                    tostring(dv.to_tree()).decode("utf-8") for dv in validations
+                )
+                tail.append("</dataValidations>")
+            tail.append("</worksheet>")
+            write("".join(tail).encode("utf-8"))
+        self._sheets.append((name, filter_ref if auto_filter else None))
+
+    def close(self) -> None:
+        sheet_types = "".join(
+            _SHEET_CONTENT_TYPE.format(n=n) for n in range(1, len(self._sheets) + 1)
+        )
+        self._zip.writestr(
+            "[Content_Types].xml", _CONTENT_TYPES_HEAD + sheet_types + "</Types>"
+        )
+        self._zip.writestr("_rels/.rels", _ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", self._workbook_xml())
+        rels = [
+            _REL.format(n=n, kind="worksheet", target=f"worksheets/sheet{n}.xml")
+            for n in range(1, len(self._sheets) + 1)
+        ]
+        rels.append(
+            _REL.format(n=len(self._sheets) + 1, kind="styles", target="styles.xml")
+        )
+        self._zip.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(rels)
+            + "</Relationships>",
+        )
+        self._zip.writestr("xl/styles.xml", self._styles_xml())
+        self._zip.close()
+
+    def _workbook_xml(self) -> str:
+        sheets = []
+        names = []
+        for idx, (name, filter_ref) in enumerate(self._sheets):
+            sheets.append(
+                f'<sheet name={quoteattr(name)} sheetId="{idx + 1}" r:id="rId{idx + 1}"/>'
+            )
+            if filter_ref:
+                start, end = filter_ref.split(":")
+                abs_ref = _absolute(start) + ":" + _absolute(end)
+                sheet_ref = "'" + name.replace("'", "''") + "'"
+                names.append(
+                    f'<definedName name="_xlnm._FilterDatabase" localSheetId="{idx}" '
+                    f'hidden="1">{escape(sheet_ref)}!{abs_ref}</definedName>'
+                )
+        defined = f"<definedNames>{''.join(names)}</definedNames>" if names else ""
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<bookViews><workbookView activeTab="0"/></bookViews>'
+            f"<sheets>{''.join(sheets)}</sheets>{defined}</workbook>"
+        )
+
+    def _styles_xml(self) -> str:
+        fills = ['<fill><patternFill patternType="none"/></fill>']
+        fills.append('<fill><patternFill patternType="gray125"/></fill>')
+        for color in self._fills:
+            fills.append(
+                f'<fill><patternFill patternType="solid"><fgColor rgb="00{color}"/>'
+                f'<bgColor rgb="00{color}"/></patternFill></fill>'
+            )
+        xfs = []
+        for bold, fill, locked, horizontal, vertical, wrap in self._styles:
+            attrs = f'numFmtId="0" fontId="{1 if bold else 0}" '
+            attrs += (
+                f'fillId="{self._fills[fill] if fill else 0}" borderId="0" xfId="0"'
+            )
+            if fill:
+                attrs += ' applyFill="1"'
+            if bold:
+                attrs += ' applyFont="1"'
+            children = ""
+            if horizontal or vertical or wrap:
+                attrs += ' applyAlignment="1"'
+                align = ""
+                if horizontal:
+                    align += f' horizontal="{horizontal}"'
+                if vertical:
+                    align += f' vertical="{vertical}"'
+                if wrap:
+                    align += ' wrapText="1"'
+                children += f"<alignment{align}/>"
+            if not locked:
+                attrs += ' applyProtection="1"'
+                children += '<protection locked="0"/>'
+            xfs.append(f"<xf {attrs}>{children}</xf>" if children else f"<xf {attrs}/>")
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+            '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            f'<fills count="{len(fills)}">{"".join(fills)}</fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/>'
+            "</border></borders>"
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" '
+            'borderId="0"/></cellStyleXfs>'
+            f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/>'
+            "</cellStyles></styleSheet>"
+        )
+
+
+def _absolute(ref: str) -> str:
+    col = ref.rstrip("0123456789")
+    return f"${col}${ref[len(col):]}"
+
+
+def _row_xml(
+    row_num: int,
+    values: Sequence,
+    letters: Sequence[str],
+    styles: Optional[Sequence[int]],
+) -> str:
+    cells = []
+    for idx, value in enumerate(values):
+        style = styles[idx] if styles else 0
+        s_attr = f' s="{style}"' if style else ""
+        ref = f"{letters[idx]}{row_num}"
+        if value is None or value == "":
+            if style:
+                cells.append(f'<c r="{ref}"{s_attr}/>')
+            continue
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}"{s_attr} t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, Number):
+            cells.append(f'<c r="{ref}"{s_attr}><v>{value}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML.sub("", str(value)))
+            space = ' xml:space="preserve"' if text != text.strip() else ""
+            cells.append(
+                f'<c r="{ref}"{s_attr} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+            )
+    return f'<row r="{row_num}">{"".join(cells)}</row>'
@@ -1,24 +1,31 @@
 from __future__ import annotations
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from typing import Callable, Optional
 
 DEFAULT_MAX_BYTES = 2 * 1024 * 1024
 DEFAULT_BACKUP_COUNT = 3
 _ui_sinks: list[Callable[[str], None]] = []
+_configured_log_dir: Optional[Path] = None
+_ui_listener: Optional[QueueListener] = None
 
 
 class CallbackHandler(logging.Handler):
-    """Lightweight bridge for piping logs into UI callbacks."""
+    """Lightweight bridge for piping logs into UI callbacks.
+
+    Runs on the QueueListener thread, so slow sinks never block the caller.
+    """
 
     def emit(self, record: logging.LogRecord) -> None:
         try:
             msg = self.format(record)
         except Exception:
             msg = record.getMessage()
-        for cb in list(_ui_sinks):
+        for cb in _ui_sinks:
             try:
                 cb(msg)
             except Exception:
@@ -27,13 +34,17 @@ class CallbackHandler(logging.Handler):
 
 
 def setup_logging(log_dir: Path, level: str = "INFO") -> logging.Logger:
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_path = log_dir / "outlook_sla.log"
-
+    global _configured_log_dir, _ui_listener
     logger = logging.getLogger("naos_sla")
-    if logger.handlers:
+    # Configure once per process; later calls (chained commands, UI start)
+    # must not reopen the log file or stack duplicate handlers.
+    if _configured_log_dir is not None or logger.handlers:
         return logger
 
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / "outlook_sla.log"
+
     logger.setLevel(getattr(logging, level.upper(), logging.INFO))
 
     formatter = logging.Formatter(
@@ -56,8 +67,13 @@ def setup_logging(log_dir: Path, level: str = "INFO") -> logging.Logger:
 
     cb = CallbackHandler()
     cb.setFormatter(formatter)
-    logger.addHandler(cb)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    _ui_listener = QueueListener(log_queue, cb, respect_handler_level=True)
+    _ui_listener.start()
+    atexit.register(_ui_listener.stop)
 
+    _configured_log_dir = log_dir
     logger.debug("Logger initialized at %s", log_path)
     return logger
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from html import escape
 from typing import List, Optional, Tuple
 
 from config import AppConfig
@@ -12,14 +13,40 @@ log = get_logger(__name__)
 VOTING_OPTIONS_RU = "OK;Нужно время;Закрыть;Не наш"
 
 
-def _html_section(title: str, content: str) -> str:
-    return f"""
+_SECTION_TEMPLATE = """
     <div style="margin-bottom:12px;">
       <div style="font-weight:600;color:#0F172A;margin-bottom:4px;">{title}</div>
       <div style="color:#111827;line-height:1.4;">{content}</div>
     </div>
     """
 
+_OVERDUE_TEMPLATE = """
+    <html>
+      <body style="font-family:Segoe UI, Arial, sans-serif; background:#F8FAFC; padding:16px;">
+        <div style="max-width:720px; margin:0 auto; background:#fff; padding:16px; border-radius:10px; box-shadow:0 4px 14px rgba(0,0,0,0.06);">
+          <div style='font-size:18px;font-weight:700;color:#111827;'>Просрочка SLA #{ticket_id} — {prio_tag}</div>
+          <div style="color:#334155;margin:8px 0 12px 0;">{subject}</div>
+          {what_to_do}
+          {links}
+          {data}
+        </div>
+      </body>
+    </html>
+    """
+
+
+def _html_section(title: str, content: str) -> str:
+    return _SECTION_TEMPLATE.format(title=title, content=content)
+
+
+_WHAT_TO_DO_SECTION = _html_section(
+    "Что сделать сейчас",
+    """
+    1) Нажмите Voting: <b>OK / Нужно время / Закрыть / Не наш</b><br>
+    2) Или ответьте командами: <code>/status</code>, <code>/prio</code>, <code>/owner</code>, <code>/comment</code>
+    """,
+)
+
 
 def _build_overdue_html(
     cfg: AppConfig,
@@ -28,56 +55,42 @@ def _build_overdue_html(
     priority: Optional[str],
     excel_path: str,
 ) -> str:
-    prio_tag = priority.upper() if priority else "n/a"
+    prio_tag = escape(priority.upper()) if priority else "n/a"
+    subject = escape(ticket_subject or "")
     guide_url = cfg.docs_url or cfg.sharepoint_url or ""
     guide_link = (
-        f'<a href="{guide_url}">Гайд/шпаргалка</a>'
+        f'<a href="{escape(guide_url)}">Гайд/шпаргалка</a>'
         if guide_url
         else "Гайд в SharePoint"
     )
-    excel_hint = f"Excel: {excel_path}"
-    intro = f"<div style='font-size:18px;font-weight:700;color:#111827;'>Просрочка SLA #{ticket_id} — {prio_tag}</div>"
-    what_to_do = """
-    1) Нажмите Voting: <b>OK / Нужно время / Закрыть / Не наш</b><br>
-    2) Или ответьте командами: <code>/status</code>, <code>/prio</code>, <code>/owner</code>, <code>/comment</code>
-    """
-    links = f"{guide_link}<br>{excel_hint}"
-    return f"""
-    <html>
-      <body style="font-family:Segoe UI, Arial, sans-serif; background:#F8FAFC; padding:16px;">
-        <div style="max-width:720px; margin:0 auto; background:#fff; padding:16px; border-radius:10px; box-shadow:0 4px 14px rgba(0,0,0,0.06);">
-          {intro}
-          <div style="color:#334155;margin:8px 0 12px 0;">{ticket_subject}</div>
-          {_html_section("Что сделать сейчас", what_to_do)}
-          {_html_section("Ссылки и гайд", links)}
-          {_html_section("Данные обращения", f"ID: <b>{ticket_id}</b><br>Тема: {ticket_subject}<br>Приоритет: {prio_tag}<br>Сформировано: {datetime.utcnow().isoformat()}Z")}
-        </div>
-      </body>
-    </html>
-    """
+    links = f"{guide_link}<br>Excel: {escape(excel_path)}"
+    data = (
+        f"ID: <b>{ticket_id}</b><br>Тема: {subject}<br>Приоритет: {prio_tag}"
+        f"<br>Сформировано: {datetime.utcnow().isoformat()}Z"
+    )
+    return _OVERDUE_TEMPLATE.format(
+        ticket_id=ticket_id,
+        prio_tag=prio_tag,
+        subject=subject,
+        what_to_do=_WHAT_TO_DO_SECTION,
+        links=_html_section("Ссылки и гайд", links),
+        data=_html_section("Данные обращения", data),
+    )
 
 
 def _filter_recipients(
     cfg: AppConfig, recipients: List[str]
 ) -> Tuple[List[str], List[str]]:
-    allowed_domains = {d.lower().strip() for d in (cfg.send_allow_domains or []) if d}
-    allowlist = {a.lower().strip() for a in (cfg.send_allowlist or []) if a}
-    allowlist |= {a.lower().strip() for a in (cfg.test_allowlist or []) if a}
     allowed: List[str] = []
     blocked: List[str] = []
     for rec in recipients:
         r = (rec or "").strip().lower()
         if not r:
             continue
-        if r in allowlist:
-            allowed.append(r)
-            continue
-        if allowed_domains and any(
-            r.endswith("@" + d) or r.endswith("." + d) for d in allowed_domains
-        ):
+        if cfg.is_allowed_recipient(r):
             allowed.append(r)
-            continue
-        blocked.append(r)
+        else:
+            blocked.append(r)
     return allowed, blocked
 
 
@@ -4,16 +4,32 @@ import re
 import subprocess
 from collections import Counter
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import pythoncom
 import win32com.client
 
+try:
+    import psutil
+except Exception:  # pragma: no cover - optional dependency, PowerShell fallback
+    psutil = None  # type: ignore
+
 from config import AppConfig
 from core.logger import get_logger
 from core.outlook_iface import OutlookLike
-from core.utils import dt_to_restrict_str, passes_sender_filter, safe_call, safe_get
+from core.utils import dt_to_restrict_str, safe_call, safe_get, sender_filter
 
 log = get_logger(__name__)
 
@@ -21,11 +37,26 @@ log = get_logger(__name__)
 FOLDER_INBOX = 6
 FOLDER_SENT = 5
 
+# Rows pulled per Table.GetArray call in iter_rows.
+TABLE_CHUNK = 500
+# PR_SENDER_SMTP_ADDRESS: SMTP sender even for Exchange (EX-type) senders.
+PR_SENDER_SMTP = "http://schemas.microsoft.com/mapi/proptag/0x5D01001F"
+DASL_DATE_RECEIVED = "urn:schemas:httpmail:datereceived"
+_DIAGNOSE_COLUMNS = ("MessageClass", "SenderEmailAddress", PR_SENDER_SMTP)
+
+_EMAIL_RE = re.compile(r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+# Forwarded-header labels; a line matches when its text before the first ":"
+# is exactly one of these (same as startswith("<label>:")).
+_FWD_PREFIXES = frozenset({"from", "reply-to", "email", "e-mail", "от", "кому"})
+
 
 def get_sender_smtp(mail) -> str:
     sender = safe_get(mail, "Sender")
     if sender:
-        exch_user = safe_call(lambda: sender.GetExchangeUser(), None)
+        try:
+            exch_user = sender.GetExchangeUser()
+        except Exception:
+            exch_user = None
         if exch_user:
             smtp = safe_get(exch_user, "PrimarySmtpAddress")
             if smtp:
@@ -37,21 +68,32 @@ def get_sender_smtp(mail) -> str:
     return str(addr2 or "").lower()
 
 
+@lru_cache(maxsize=8)
+def _internal_suffixes(internal_domains: Tuple[str, ...]) -> Tuple[str, ...]:
+    domains = [d.lower().strip() for d in internal_domains if d]
+    return tuple("@" + d for d in domains) + tuple("." + d for d in domains)
+
+
 def _is_internal(email: str, internal_domains: Optional[List[str]]) -> bool:
     if not email:
         return False
-    domains = [d.lower().strip() for d in (internal_domains or []) if d]
-    email_l = email.lower()
-    for dom in domains:
-        if email_l.endswith("@" + dom) or email_l.endswith("." + dom):
-            return True
-    return False
+    return email.lower().endswith(_internal_suffixes(tuple(internal_domains or ())))
+
+
+def _head_lines(text: str, count: int, window: int = 8192) -> List[str]:
+    """text.splitlines()[:count] without splitting the whole of a long body."""
+    if len(text) > window:
+        lines = text[:window].splitlines()
+        # More than count pieces means the count-th line ended inside the window.
+        if len(lines) > count:
+            return lines[:count]
+    return text.splitlines()[:count]
 
 
 def extract_customer_email(
     msg,
     sender_smtp: str,
-    body_text: str,
+    body_text: Union[str, Callable[[], str]],
     subject: str,
     internal_domains: Optional[List[str]] = None,
 ) -> Optional[str]:
@@ -60,6 +102,9 @@ def extract_customer_email(
     1) External sender (not internal) -> sender_smtp
     2) Forwarded markers in body (From/От/Reply-To/Email/Кому) -> first email
     3) Outlook reply-to/recipients fields -> first non-internal
+
+    body_text may be a zero-argument callable (e.g. ``lambda: safe_get(msg,
+    "Body", "")``); it is only called when the sender is internal.
     """
     sender_smtp = (sender_smtp or "").strip().lower()
     # 1) external sender
@@ -67,31 +112,23 @@ def extract_customer_email(
         return sender_smtp
 
     # 2) scan body top lines for forwarded headers
+    if callable(body_text):
+        body_text = body_text() or ""
     if body_text:
-        lines = body_text.splitlines()
-        top_lines = lines[:80]
-        email_re = re.compile(r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+        # Lines without "@" cannot hold an address; the memchr-backed check
+        # is far cheaper than the regex and skips most body lines.
+        top_lines = [ln for ln in _head_lines(body_text, 80) if "@" in ln]
         for ln in top_lines:
-            low = ln.lower()
-            if any(
-                low.startswith(prefix)
-                for prefix in (
-                    "from:",
-                    "reply-to:",
-                    "email:",
-                    "e-mail:",
-                    "от:",
-                    "кому:",
-                )
-            ):
-                m = email_re.search(ln)
+            head, sep, _ = ln.partition(":")
+            if sep and head.lower() in _FWD_PREFIXES:
+                m = _EMAIL_RE.search(ln)
                 if m:
                     cand = m.group(1).lower()
                     if not _is_internal(cand, internal_domains):
                         return cand
         # fallback: first email anywhere in top lines
         for ln in top_lines:
-            m = email_re.search(ln)
+            m = _EMAIL_RE.search(ln)
             if m:
                 cand = m.group(1).lower()
                 if not _is_internal(cand, internal_domains):
@@ -135,6 +172,27 @@ def extract_customer_email(
     return None
 
 
+def _received_restriction(since: datetime, until: Optional[datetime]) -> str:
+    """DASL filter on the received time for Items.Restrict / Folder.GetTable.
+
+    DASL compares dates in UTC, unlike the local-time Jet [ReceivedTime]
+    syntax, so the local naive bounds are converted first.
+    """
+    until_dt = until or datetime.now()
+    lo = dt_to_restrict_str(since.astimezone(timezone.utc))
+    hi = dt_to_restrict_str(until_dt.astimezone(timezone.utc))
+    return (
+        f"@SQL=\"{DASL_DATE_RECEIVED}\" >= '{lo}'"
+        f" AND \"{DASL_DATE_RECEIVED}\" <= '{hi}'"
+    )
+
+
+def _is_mail_class(message_class) -> bool:
+    # olMail items (Class 43) are IPM.Note and its IPM.Note.* variants.
+    cls = str(message_class or "")
+    return cls == "IPM.Note" or cls.startswith("IPM.Note.")
+
+
 @dataclass
 class OutlookEnvironment:
     classic_available: bool
@@ -142,23 +200,37 @@ class OutlookEnvironment:
     details: str
 
 
+# Process names (without .exe) of the New Outlook (olk) app.
+NEW_OUTLOOK_PROCESSES = frozenset({"olk", "newoutlook", "olks"})
+
+
+def _new_outlook_running() -> bool:
+    if psutil is not None:
+        for proc in psutil.process_iter(["name"]):
+            name = (proc.info.get("name") or "").lower()
+            if name.removesuffix(".exe") in NEW_OUTLOOK_PROCESSES:
+                return True
+        return False
+    # One PowerShell start for all candidates; Get-Process takes bare names.
+    proc = subprocess.run(
+        [
+            "powershell",
+            "-NoProfile",
+            "-Command",
+            "[bool](Get-Process -Name "
+            + ",".join(sorted(NEW_OUTLOOK_PROCESSES))
+            + " -ErrorAction SilentlyContinue)",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    return proc.returncode == 0 and proc.stdout.strip().lower() == "true"
+
+
 def detect_outlook_environment() -> OutlookEnvironment:
     new_outlook = False
     try:
-        for candidate in ("olk.exe", "newoutlook.exe", "olks.exe"):
-            proc = subprocess.run(
-                [
-                    "powershell",
-                    "-NoProfile",
-                    "-Command",
-                    f"(Get-Process {candidate} -ErrorAction SilentlyContinue) -ne $null",
-                ],
-                capture_output=True,
-                text=True,
-            )
-            if proc.returncode == 0 and proc.stdout.strip().lower() == "true":
-                new_outlook = True
-                break
+        new_outlook = _new_outlook_running()
     except Exception:
         pass
 
@@ -191,6 +263,8 @@ class OutlookClient(OutlookLike):
         self.cfg = cfg
         self.outlook = None
         self.ns = None
+        # Folder EntryID -> its Items collection, already sorted by ReceivedTime.
+        self._sorted_items_cache: Dict[str, object] = {}
 
     def __enter__(self):
         env = detect_outlook_environment()
@@ -204,6 +278,7 @@ class OutlookClient(OutlookLike):
         return self
 
     def __exit__(self, exc_type, exc, tb):
+        self._sorted_items_cache.clear()
         try:
             pythoncom.CoUninitialize()
         except Exception:
@@ -230,37 +305,80 @@ class OutlookClient(OutlookLike):
             raise RuntimeError("Outlook namespace not initialized")
         return self.ns.GetDefaultFolder(FOLDER_SENT)
 
+    def _sorted_items(self, folder):
+        """folder.Items sorted newest first, sorted once per folder per session."""
+        key = safe_get(folder, "EntryID")
+        items = self._sorted_items_cache.get(key) if key else None
+        if items is None:
+            items = folder.Items
+            items.Sort("[ReceivedTime]", True)
+            if key:
+                self._sorted_items_cache[key] = items
+        return items
+
     def iter_messages(
         self, since: datetime, until: Optional[datetime] = None
     ) -> Iterable:
-        inbox = self.get_folder()
-        items = inbox.Items
-        items.Sort("[ReceivedTime]", True)
-        until_dt = until or datetime.now()
-        restriction = f"[ReceivedTime] >= '{dt_to_restrict_str(since)}' AND [ReceivedTime] <= '{dt_to_restrict_str(until_dt)}'"
-        restricted = items.Restrict(restriction)
-        item = safe_call(lambda: restricted.GetFirst())
+        items = self._sorted_items(self.get_folder())
+        restricted = items.Restrict(_received_restriction(since, until))
+        get_next = restricted.GetNext
+        item = safe_call(restricted.GetFirst)
         while item:
             yield item
-            item = safe_call(lambda: restricted.GetNext())
+            try:
+                item = get_next()
+            except pythoncom.com_error:
+                # Transient RPC errors get safe_call's retries; the happy path
+                # stays a plain bound-method call.
+                item = safe_call(get_next)
+            except Exception:
+                break
+
+    def iter_rows(
+        self,
+        since: datetime,
+        until: Optional[datetime] = None,
+        columns: Sequence[str] = ("EntryID", "MessageClass", "ReceivedTime"),
+    ) -> Iterator[Dict[str, object]]:
+        """Yield {column: value} per message via Folder.GetTable.
+
+        Only the requested columns are read, TABLE_CHUNK rows per COM call,
+        instead of one round trip per item property. Open the item with
+        ns.GetItemFromID(row["EntryID"]) when the body is needed.
+        """
+        table = self.get_folder().GetTable(_received_restriction(since, until))
+        table.Columns.RemoveAll()
+        for column in columns:
+            table.Columns.Add(column)
+        while not table.EndOfTable:
+            chunk = table.GetArray(TABLE_CHUNK)
+            if not chunk:
+                break
+            for values in chunk:
+                yield dict(zip(columns, values))
 
     def diagnose(self, days: int) -> Tuple[int, int, List[Tuple[str, int]]]:
         start = datetime.now() - timedelta(days=days)
-        before_filter = 0
-        after_filter = 0
-        sender_counts: Counter[str] = Counter()
-        for item in self.iter_messages(start):
-            cls = safe_get(item, "Class", 0)
-            if cls != 43:
-                continue
-            before_filter += 1
-            sender = get_sender_smtp(item)
-            sender_counts[sender] += 1
-            if not passes_sender_filter(sender or "", self.cfg):
-                continue
-            after_filter += 1
+        try:
+            senders = [
+                str(row[PR_SENDER_SMTP] or row["SenderEmailAddress"] or "").lower()
+                for row in self.iter_rows(start, columns=_DIAGNOSE_COLUMNS)
+                if _is_mail_class(row["MessageClass"])
+            ]
+        except Exception as exc:
+            log.warning("Outlook table scan failed, reading items: %s", exc)
+            senders = [
+                get_sender_smtp(item)
+                for item in self.iter_messages(start)
+                if safe_get(item, "Class", 0) == 43
+            ]
+        sender_counts: Counter[str] = Counter(senders)
+        passes_sender = sender_filter(self.cfg)
+        after_filter = sum(
+            count for sender, count in sender_counts.items() if passes_sender(sender)
+        )
         top10 = sender_counts.most_common(10)
-        return before_filter, after_filter, top10
+        return len(senders), after_filter, top10
 
     def send_mail(
         self,
@@ -59,7 +59,7 @@ class FakeOutlookClient:
         return False
 
     def iter_messages(self, since, until=None):
-        return list(self.messages)
+        return iter(self.messages)
 
     def send_mail(
         self,
@@ -1,24 +1,54 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
-import pandas as pd
+import numpy as np
+from openpyxl import load_workbook
 
 from config import AppConfig
-from core import db
+from core import db, db_pool
 
 log = logging.getLogger("naos_sla.recommend")
 
 
 try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
+    import joblib
+    from sklearn.feature_extraction.text import (
+        HashingVectorizer,
+        TfidfTransformer,
+        TfidfVectorizer,
+    )
     from sklearn.metrics.pairwise import cosine_similarity
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import normalize
 except Exception:  # pragma: no cover - optional dependency handled gracefully
+    joblib = None  # type: ignore
+    HashingVectorizer = None  # type: ignore
+    TfidfTransformer = None  # type: ignore
     TfidfVectorizer = None  # type: ignore
+    make_pipeline = None  # type: ignore
     cosine_similarity = None  # type: ignore
+    normalize = None  # type: ignore
+
+_SQL_UPDATE_RECOMMENDATION = f"""
+    UPDATE tickets
+    SET flags = (flags & ~{db.FLAG_IS_REPEAT}) | (? * {db.FLAG_IS_REPEAT}),
+        repeat_hint=?, recommended_answer=?, match_score=?, topic=?
+    WHERE id=?
+"""
+
+# Above this many tickets the ticket matrix uses hashed features.
+HASHING_MIN_TICKETS = 5000
+# Bump when vectorizer parameters change so stale caches are refit.
+TFIDF_CACHE_VERSION = 1
+TFIDF_CACHE_NAME = "tfidf.joblib"
+# Ticket rows per dense similarity block (block x N floats in memory).
+SIMILARITY_BLOCK = 512
 
 
 @dataclass
@@ -27,67 +57,171 @@ class RecommendationRule:
     answer: str
 
 
-def _safe_vectorizer(max_features: int = 4000) -> TfidfVectorizer | None:
+def _safe_vectorizer(max_features: int = 4000, hashing: bool = False):
+    """TF-IDF vectorizer, or None without sklearn.
+
+    hashing=True hashes n-grams into a fixed space instead of building a
+    vocabulary first: one pass over the texts and no vocabulary in memory.
+    """
     if TfidfVectorizer is None:
         log.warning("sklearn not available, recommendations disabled")
         return None
+    if hashing:
+        return make_pipeline(
+            HashingVectorizer(
+                n_features=1 << 18,
+                ngram_range=(1, 2),
+                norm=None,
+                alternate_sign=False,
+            ),
+            TfidfTransformer(),
+        )
     return TfidfVectorizer(
         max_features=max_features, ngram_range=(1, 2), stop_words=None
     )
 
 
+def _texts_digest(texts: List[str], hashing: bool) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{TFIDF_CACHE_VERSION}:{int(hashing)}:{len(texts)}".encode())
+    for text in texts:
+        h.update(b"\0")
+        h.update(text.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def _ticket_matrix(texts: List[str], cache_path: Path):
+    """TF-IDF matrix for texts, reused from cache_path when the texts match.
+
+    Periodic runs over an unchanged lookback window skip tokenizing and
+    fitting altogether; any change in the texts refits and rewrites the cache.
+    """
+    hashing = len(texts) > HASHING_MIN_TICKETS
+    digest = _texts_digest(texts, hashing)
+    try:
+        cached = joblib.load(cache_path)
+        if cached.get("digest") == digest:
+            return cached["matrix"]
+    except FileNotFoundError:
+        pass
+    except Exception as exc:
+        log.debug("TF-IDF cache unreadable, refitting: %s", exc)
+    matrix = _safe_vectorizer(hashing=hashing).fit_transform(texts)
+    tmp = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        joblib.dump({"digest": digest, "matrix": matrix}, tmp)
+        os.replace(tmp, cache_path)
+    except Exception as exc:
+        log.debug("TF-IDF cache not saved: %s", exc)
+        tmp.unlink(missing_ok=True)
+    return matrix
+
+
+def _repeat_matches(matrix, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Per ticket: count of other tickets at >= threshold cosine, and the best.
+
+    One sparse matmul per SIMILARITY_BLOCK rows instead of one
+    cosine_similarity call per ticket; self-similarity is excluded.
+    """
+    unit = normalize(matrix, norm="l2")
+    n = unit.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    best = np.zeros(n, dtype=np.int64)
+    for start in range(0, n, SIMILARITY_BLOCK):
+        sims = (unit[start : start + SIMILARITY_BLOCK] @ unit.T).toarray()
+        rows = np.arange(sims.shape[0])
+        sims[rows, rows + start] = 0.0
+        counts[start : start + len(rows)] = (sims >= threshold).sum(axis=1)
+        # argmax picks the first of equal scores, as the stable sort did.
+        best[start : start + len(rows)] = sims.argmax(axis=1)
+    return counts, best
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; equal scores keep index
+    order, exactly like a stable descending sort truncated to k."""
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.intp)
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - len(above)]
+    top = np.concatenate([above, ties])
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
 def load_qa_pairs(path: Path) -> List[RecommendationRule]:
     if not path or not path.exists():
         return []
     try:
-        df = pd.read_excel(path, sheet_name=0)
+        # Streamed read: only the header and the two matched columns are kept.
+        wb = load_workbook(path, read_only=True, data_only=True)
     except Exception as exc:
         log.warning("Failed to load ORM script: %s", exc)
         return []
-    cols = {c.lower(): c for c in df.columns}
-    q_col = None
-    a_col = None
-    for key, col in cols.items():
-        if ("вопрос" in key) or ("question" in key):
-            q_col = col
-        if ("ответ" in key) or ("answer" in key) or ("скрипт" in key):
-            a_col = col
-    if not q_col or not a_col:
-        log.warning("ORM script does not have question/answer columns")
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        q_idx = None
+        a_idx = None
+        for idx, name in enumerate(header):
+            key = str(name or "").lower()
+            if ("вопрос" in key) or ("question" in key):
+                q_idx = idx
+            if ("ответ" in key) or ("answer" in key) or ("скрипт" in key):
+                a_idx = idx
+        if q_idx is None or a_idx is None:
+            log.warning("ORM script does not have question/answer columns")
+            return []
+        rules: List[RecommendationRule] = []
+        for row in rows:
+            q = _cell_text(row, q_idx)
+            a = _cell_text(row, a_idx)
+            if q and a:
+                rules.append(RecommendationRule(question=q, answer=a))
+        return rules
+    except Exception as exc:
+        log.warning("Failed to load ORM script: %s", exc)
         return []
-    rules: List[RecommendationRule] = []
-    for _, row in df.iterrows():
-        q = str(row.get(q_col, "") or "").strip()
-        a = str(row.get(a_col, "") or "").strip()
-        if q and a:
-            rules.append(RecommendationRule(question=q, answer=a))
-    return rules
+    finally:
+        wb.close()
+
+
+def _cell_text(row: tuple, idx: int) -> str:
+    value = row[idx] if idx < len(row) else None
+    return "" if value is None else str(value).strip()
 
 
 def update_recommendations(cfg: AppConfig) -> None:
     """Compute repeat hints and recommended answers (offline TF-IDF)."""
-    vec = _safe_vectorizer()
-    if vec is None or cosine_similarity is None:
+    if TfidfVectorizer is None:
+        log.warning("sklearn not available, recommendations disabled")
         return
     lookback = cfg.orm_similarity_days
-    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-    rows = conn.execute(
-        """
-        SELECT id, subject, body FROM tickets
-        WHERE datetime(first_received_utc) >= datetime('now', ?)
-        ORDER BY datetime(first_received_utc) DESC
-        """,
-        (f"-{lookback} day",),
-    ).fetchall()
-    if not rows:
-        conn.close()
+    # Stream rows and keep only what later steps need, not every Row object.
+    ids: List[int] = []
+    subjects: List[str] = []
+    texts: List[str] = []
+    with db_pool.get_conn(cfg) as conn:
+        for ticket_id, subject, body in db.iter_tickets(
+            conn,
+            "first_received_utc >= datetime('now', ?)",
+            (f"-{lookback} day",),
+            columns=["id", "subject", "body"],
+            raw=True,
+        ):
+            ids.append(ticket_id)
+            subjects.append(subject)
+            texts.append(f"{subject} {body}")
+    if not ids:
         return
-    texts = [f"{r['subject']} {r['body']}" for r in rows]
     try:
-        matrix = vec.fit_transform(texts)
+        matrix = _ticket_matrix(
+            texts, Path(cfg.paths.db_path).parent / TFIDF_CACHE_NAME
+        )
     except Exception as exc:
         log.warning("TF-IDF build failed: %s", exc)
-        conn.close()
         return
 
     qa_rules = load_qa_pairs(
@@ -101,36 +235,35 @@ def update_recommendations(cfg: AppConfig) -> None:
         except Exception as exc:
             log.warning("TF-IDF for QA failed: %s", exc)
             qa_matrix = None
+    qa_scores_all = None
+    if qa_matrix is not None:
+        try:
+            # One tokenizer pass and one product for all tickets.
+            qa_scores_all = cosine_similarity(qa_vec.transform(texts), qa_matrix)
+        except Exception as exc:
+            log.debug("QA recommendation failed: %s", exc)
 
-    for idx, row in enumerate(rows):
-        sims = cosine_similarity(matrix[idx], matrix).flatten()
-        sims[idx] = 0.0
-        matches = [
-            (score, rows[i])
-            for i, score in enumerate(sims)
-            if score >= cfg.orm_similarity_threshold
-        ]
-        matches.sort(key=lambda x: x[0], reverse=True)
+    updates = []
+    match_counts, best_matches = _repeat_matches(matrix, cfg.orm_similarity_threshold)
+    for idx, ticket_id in enumerate(ids):
         repeat_hint = ""
         is_repeat = False
-        if matches:
-            freq = len(matches)
-            top_subj = matches[0][1]["subject"]
+        freq = int(match_counts[idx])
+        if freq:
+            top_subj = subjects[best_matches[idx]]
             repeat_hint = f"{freq} похожих за {lookback}д (топ: {top_subj})"
             is_repeat = True
 
         recommended_answer = ""
         topic = None
         match_score = None
-        if qa_matrix is not None and qa_vec is not None and qa_rules:
+        if qa_scores_all is not None:
             try:
-                ticket_vec = qa_vec.transform([texts[idx]])
-                qa_scores = cosine_similarity(ticket_vec, qa_matrix).flatten()
-                best_pairs = sorted(
-                    enumerate(qa_scores), key=lambda x: x[1], reverse=True
-                )[: cfg.orm_max_suggestions]
+                qa_scores = qa_scores_all[idx]
                 best_pairs = [
-                    p for p in best_pairs if p[1] >= cfg.orm_similarity_threshold
+                    (int(i), qa_scores[i])
+                    for i in _top_k(qa_scores, cfg.orm_max_suggestions)
+                    if qa_scores[i] >= cfg.orm_similarity_threshold
                 ]
                 if best_pairs:
                     best_idx, best_score = best_pairs[0]
@@ -140,21 +273,16 @@ def update_recommendations(cfg: AppConfig) -> None:
             except Exception as exc:
                 log.debug("QA recommendation failed: %s", exc)
 
-        conn.execute(
-            """
-            UPDATE tickets
-            SET is_repeat=?, repeat_hint=?, recommended_answer=?, match_score=?, topic=?
-            WHERE id=?
-            """,
+        updates.append(
             (
                 int(is_repeat),
                 repeat_hint,
                 recommended_answer,
                 match_score,
                 topic,
-                row["id"],
-            ),
+                ticket_id,
+            )
         )
-    conn.commit()
-    conn.close()
-    log.info("Recommendations refreshed for %s tickets", len(rows))
+    with db_pool.get_conn(cfg) as conn, db.write_transaction(conn):
+        conn.executemany(_SQL_UPDATE_RECOMMENDATION, updates)
+    log.info("Recommendations refreshed for %s tickets", len(ids))
@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import re
 import sqlite3
-from datetime import datetime, time, timedelta
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from operator import itemgetter
 from typing import Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
+
 from config import AppConfig
-from core import db, recommend
+from core import db, db_pool, recommend
 from core.db import TicketRecord
 from core.logger import get_logger
 from core.outlook import OutlookClient, extract_customer_email, get_sender_smtp
@@ -14,12 +19,39 @@ from core.utils import (
     clean_text,
     compute_stable_id,
     normalize_subject,
-    passes_sender_filter,
     safe_get,
+    sender_filter,
 )
 
 log = get_logger(__name__)
 
+_STATUS_CLEAN_RE = re.compile(r"[^a-z\u0430-\u044f\u0451 0-9_]+", re.IGNORECASE)
+_STATUS_KV_RE = re.compile(
+    r"(status|\u0441\u0442\u0430\u0442\u0443\u0441)\s*[:=]\s*([\w\s-]+)", re.IGNORECASE
+)
+
+# Sort/search key for (sent_on, payload) events in the sent index.
+_event_time = itemgetter(0)
+
+_SQL_RECALC_WAITING = (
+    "UPDATE tickets SET days_without_update=?,"
+    f" flags = flags & ~{db.FLAG_OVERDUE} WHERE id=?"
+)
+# waiting_customer tickets never change status, so SQLite updates them all.
+_SQL_RECALC_WAITING_ALL = f"""
+    UPDATE tickets
+    SET days_without_update = MAX(
+            0, CAST(julianday(?) - julianday(date(last_status_utc)) AS INTEGER)
+        ),
+        flags = flags & ~{db.FLAG_OVERDUE}
+    WHERE status = ?
+"""
+_SQL_RECALC_TICKET = (
+    "UPDATE tickets SET days_without_update=?,"
+    f" flags = (flags & ~{db.FLAG_OVERDUE}) | (? * {db.FLAG_OVERDUE}), status=?,"
+    " last_status_utc=? WHERE id=?"
+)
+
 # Statuses are ASCII codes; RU labels are for display.
 STATUS_NEW = "new"
 STATUS_ASSIGNED = "assigned"
@@ -65,6 +97,9 @@ STATUS_ORDER = {
 }
 
 
+# Only a handful of distinct status strings exist, and recalc_open and the
+# Excel export normalise one per row.
+@lru_cache(maxsize=256)
 def normalize_status_code(code: Optional[str]) -> Optional[str]:
     if code is None:
         return None
@@ -88,9 +123,7 @@ def status_text_to_code(text: str) -> Optional[str]:
         return t
     if t in STATUS_ALIASES:
         return STATUS_ALIASES[t]
-    t_clean = re.sub(
-        r"[^a-z\u0430-\u044f\u0451 0-9_]+", "", t, flags=re.IGNORECASE
-    ).strip()
+    t_clean = _STATUS_CLEAN_RE.sub("", t).strip()
     return STATUS_TEXT_MAP.get(t_clean) or STATUS_TEXT_MAP.get(
         t_clean.replace(" ", "_")
     )
@@ -185,137 +218,208 @@ def business_hours_between(
     """Посчитать рабочие часы (пн-пт, start_hour-end_hour), игнорируя выходные и список holidays (YYYY-MM-DD)."""
     if end <= start:
         return 0.0
-    holidays_set = set(holidays or [])
-    total = 0.0
-    current = start
-    end_date = end.date()
-    while current.date() <= end_date:
-        is_weekend = current.weekday() >= 5
-        is_holiday = current.date().isoformat() in holidays_set
-        if not is_weekend and not is_holiday:
-            sh = max(0, min(23, start_hour))
-            eh = end_hour
-            if eh >= 24:
-                day_end = datetime.combine(
-                    current.date(), time(hour=23, minute=59, second=59)
-                )
-            else:
-                day_end = datetime.combine(current.date(), time(hour=max(sh, eh)))
-            day_start = datetime.combine(current.date(), time(hour=sh))
-            interval_start = max(current, day_start)
-            interval_end = min(end, day_end)
-            if interval_end > interval_start:
-                total += (interval_end - interval_start).total_seconds() / 3600.0
-        current = datetime.combine(current.date(), time.min) + timedelta(days=1)
+    holidays_set = (
+        holidays if isinstance(holidays, frozenset) else frozenset(holidays or ())
+    )
+    sh = max(0, min(23, start_hour))
+    day_end = time(23, 59, 59) if end_hour >= 24 else time(hour=max(sh, end_hour))
+    day_start = time(hour=sh)
+
+    def overlap(day: date, lo: datetime, hi: datetime) -> float:
+        if day.weekday() >= 5 or day.isoformat() in holidays_set:
+            return 0.0
+        s = max(lo, datetime.combine(day, day_start))
+        e = min(hi, datetime.combine(day, day_end))
+        return (e - s).total_seconds() / 3600.0 if e > s else 0.0
+
+    start_d, end_d = start.date(), end.date()
+    if start_d == end_d:
+        return overlap(start_d, start, end)
+    total = overlap(start_d, start, end) + overlap(end_d, start, end)
+    # Whole days strictly between the two: count business days in C.
+    full_days = int(
+        np.busday_count(
+            start_d + timedelta(days=1), end_d, holidays=_holiday_days(holidays_set)
+        )
+    )
+    if full_days:
+        total += full_days * _day_span_hours(day_start, day_end)
     return max(total, 0.0)
 
 
+def _day_span_hours(day_start: time, day_end: time) -> float:
+    span = datetime.combine(date.min, day_end) - datetime.combine(date.min, day_start)
+    return max(span.total_seconds() / 3600.0, 0.0)
+
+
+@lru_cache(maxsize=32)
+def _holiday_days(holidays: frozenset) -> np.ndarray:
+    """ISO holiday strings as datetime64[D]; malformed entries never match a
+    day's isoformat(), so they are dropped."""
+    days = []
+    for h in holidays:
+        try:
+            d = date.fromisoformat(str(h))
+        except ValueError:
+            continue
+        if d.isoformat() == h:
+            days.append(d)
+    return np.array(sorted(days), dtype="datetime64[D]")
+
+
+def business_hours_since(
+    received: Iterable[str],
+    now: datetime,
+    start_hour: int = 10,
+    end_hour: int = 19,
+    holidays: Optional[Iterable[str]] = None,
+) -> List[float]:
+    """business_hours_between(r, now) for each ISO timestamp r, in numpy.
+
+    The first-day overlap, whole business days and the overlap on now's day
+    are computed over the whole array instead of once per ticket.
+    """
+    recv = np.array(list(received), dtype="datetime64[us]")
+    if not len(recv):
+        return []
+    holidays_set = (
+        holidays if isinstance(holidays, frozenset) else frozenset(holidays or ())
+    )
+    holi = _holiday_days(holidays_set)
+    sh = max(0, min(23, start_hour))
+    eh = 23 * 3600 + 59 * 60 + 59 if end_hour >= 24 else max(sh, end_hour) * 3600
+    day_start = np.timedelta64(sh * 3600, "s").astype("timedelta64[us]")
+    day_end = np.timedelta64(eh, "s").astype("timedelta64[us]")
+    now64 = np.datetime64(now, "us")
+    now_d = now64.astype("datetime64[D]")
+
+    def overlap(day, lo, hi):
+        s = np.maximum(lo, day + day_start)
+        e = np.minimum(hi, day + day_end)
+        # Same arithmetic as timedelta.total_seconds() / 3600.0.
+        hours = (e - s).astype(np.int64) / 1e6 / 3600.0
+        return np.where((e > s) & np.is_busday(day, holidays=holi), hours, 0.0)
+
+    days = recv.astype("datetime64[D]")
+    total = overlap(days, recv, now64)
+    later = days < now_d
+    if later.any():
+        midnight = now_d.astype("datetime64[us]")
+        last = overlap(np.array([now_d]), midnight, now64)[0]
+        full = np.busday_count(days[later] + 1, now_d, holidays=holi)
+        span = max(int((day_end - day_start).astype(np.int64)) / 1e6 / 3600.0, 0.0)
+        total[later] = total[later] + last + full * span
+    total[recv >= now64] = 0.0
+    return total.tolist()
+
+
 def ingest_range(cfg: AppConfig, days: int, outlook_factory=None) -> int:
-    db.ensure_schema(cfg)
     start_dt = datetime.now() - timedelta(days=days)
     processed = 0
     skipped_sender_filter = 0
     skipped_non_mailitem = 0
+    passes_sender = sender_filter(cfg)
+    # Full UPSERT_BATCH_SIZE buffers are merged through the staging table;
+    # the short tail goes through plain executemany.
+    pending: List[TicketRecord] = []
     factory = outlook_factory or OutlookClient
     with factory(cfg) as outlook:
         sent_idx = _build_sent_index(outlook, start_dt)
-        conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-        cur = conn.cursor()
-        cur.execute("BEGIN")
-        try:
-            for msg in outlook.iter_messages(start_dt):
-                cls = safe_get(msg, "Class", 0)
-                if cls != 43:
-                    skipped_non_mailitem += 1
-                    continue
-                received_raw = safe_get(msg, "ReceivedTime")
-                if not received_raw:
-                    continue
-                # pywintypes datetime -> python datetime
-                received = _to_naive(received_raw)
-                if not isinstance(received, datetime):
-                    continue
-                sender = get_sender_smtp(msg)
-                if not passes_sender_filter(sender, cfg):
-                    skipped_sender_filter += 1
-                    continue
-
-                subject = safe_get(msg, "Subject", "") or ""
-                body_raw = safe_get(msg, "Body", "") or ""
-                body = clean_text(body_raw)
-                conv_id = safe_get(msg, "ConversationID")
-                norm_subj = normalize_subject(subject)
-                thread_key = (conv_id or norm_subj).lower()
-                entry_id = safe_get(msg, "EntryID")
-
-                sent_info = sent_idx.get(thread_key, {"replies": [], "forwards": []})
-                first_reply = _find_first_after(sent_info["replies"], received)
-                first_forward = _find_first_after(sent_info["forwards"], received)
-
-                requires_table = False
-                is_uninteresting = False
-
-                base_status = derive_base_status(
-                    bool(first_forward[0]),
-                    bool(first_reply[0]),
-                    requires_table,
-                    is_uninteresting,
-                )
-                last_status_utc = first_reply[0] or first_forward[0] or received
-                stable_id = compute_stable_id(
-                    conv_id, received, sender, norm_subj, body
-                )
-                rec_answer = ""
-                customer_email = extract_customer_email(
-                    msg,
-                    sender,
-                    body_raw or "",
-                    subject or "",
-                    cfg.customer_internal_domains,
-                )
-                record = TicketRecord(
-                    id=None,
-                    conv_id=conv_id,
-                    thread_key=thread_key,
-                    entry_id=entry_id,
-                    first_received_utc=received,
-                    sender=sender,
-                    customer_email=customer_email,
-                    subject=subject,
-                    body=body,
-                    first_forward_utc=first_forward[0],
-                    first_forward_to=first_forward[1],
-                    first_reply_utc=first_reply[0],
-                    first_reply_body=first_reply[1],
-                    responsible=first_forward[1],
-                    status=base_status,
-                    last_status_utc=last_status_utc,
-                    days_without_update=max(
-                        0, (datetime.utcnow().date() - last_status_utc.date()).days
-                    ),
-                    overdue=False,
-                    not_interesting=is_uninteresting,
-                    is_repeat=False,
-                    repeat_hint=None,
-                    recommended_answer=rec_answer,
-                    match_score=None,
-                    topic=None,
-                    last_reminder_utc=None,
-                    priority=None,
-                    stable_id=stable_id,
-                    last_updated_at=datetime.utcnow(),
-                    last_updated_by="ingest",
-                    data_source="outlook",
-                    comment=None,
-                )
-                db.upsert_ticket(conn, record)
-                processed += 1
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        with db_pool.get_conn(cfg) as conn:
+            with db.write_transaction(conn):
+                for msg in outlook.iter_messages(start_dt):
+                    cls = safe_get(msg, "Class", 0)
+                    if cls != 43:
+                        skipped_non_mailitem += 1
+                        continue
+                    received_raw = safe_get(msg, "ReceivedTime")
+                    if not received_raw:
+                        continue
+                    # pywintypes datetime -> python datetime
+                    received = _to_naive(received_raw)
+                    if not isinstance(received, datetime):
+                        continue
+                    sender = get_sender_smtp(msg)
+                    if not passes_sender(sender):
+                        skipped_sender_filter += 1
+                        continue
+
+                    subject = safe_get(msg, "Subject", "") or ""
+                    body_raw = safe_get(msg, "Body", "") or ""
+                    body = clean_text(body_raw)
+                    conv_id = safe_get(msg, "ConversationID")
+                    norm_subj = normalize_subject(subject)
+                    thread_key = (conv_id or norm_subj).lower()
+                    entry_id = safe_get(msg, "EntryID")
+
+                    sent_info = sent_idx.get(
+                        thread_key, {"replies": [], "forwards": []}
+                    )
+                    first_reply = _find_first_after(sent_info["replies"], received)
+                    first_forward = _find_first_after(sent_info["forwards"], received)
+
+                    requires_table = False
+                    is_uninteresting = False
+
+                    base_status = derive_base_status(
+                        bool(first_forward[0]),
+                        bool(first_reply[0]),
+                        requires_table,
+                        is_uninteresting,
+                    )
+                    last_status_utc = first_reply[0] or first_forward[0] or received
+                    stable_id = compute_stable_id(
+                        conv_id, received, sender, norm_subj, body
+                    )
+                    rec_answer = ""
+                    customer_email = extract_customer_email(
+                        msg,
+                        sender,
+                        body_raw or "",
+                        subject or "",
+                        cfg.customer_internal_domains,
+                    )
+                    record = TicketRecord(
+                        id=None,
+                        conv_id=conv_id,
+                        thread_key=thread_key,
+                        entry_id=entry_id,
+                        first_received_utc=received,
+                        sender=sender,
+                        customer_email=customer_email,
+                        subject=subject,
+                        body=body,
+                        first_forward_utc=first_forward[0],
+                        first_forward_to=first_forward[1],
+                        first_reply_utc=first_reply[0],
+                        first_reply_body=first_reply[1],
+                        responsible=first_forward[1],
+                        status=base_status,
+                        last_status_utc=last_status_utc,
+                        days_without_update=max(
+                            0, (datetime.utcnow().date() - last_status_utc.date()).days
+                        ),
+                        overdue=False,
+                        not_interesting=is_uninteresting,
+                        is_repeat=False,
+                        repeat_hint=None,
+                        recommended_answer=rec_answer,
+                        match_score=None,
+                        topic=None,
+                        last_reminder_utc=None,
+                        priority=None,
+                        stable_id=stable_id,
+                        last_updated_at=datetime.utcnow(),
+                        last_updated_by="ingest",
+                        data_source="outlook",
+                        comment=None,
+                    )
+                    pending.append(record)
+                    if len(pending) >= db.UPSERT_BATCH_SIZE:
+                        db.bulk_upsert_tickets(conn, pending)
+                        pending.clear()
+                    processed += 1
+                db.upsert_tickets(conn, pending, return_ids=False)
     log.info(
         "Ingest summary: processed=%s, skipped_sender_filter=%s, skipped_non_mailitem=%s",
         processed,
@@ -326,51 +430,75 @@ def ingest_range(cfg: AppConfig, days: int, outlook_factory=None) -> int:
 
 
 def recalc_open(cfg: AppConfig) -> int:
-    db.ensure_schema(cfg)
-    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    with db_pool.get_conn(cfg) as conn:
+        updated = _recalc_open_tickets(cfg, conn)
+    try:
+        recommend.update_recommendations(cfg)
+    except Exception as exc:
+        log.warning("Recommendations refresh failed: %s", exc)
+    return updated
+
+
+def _recalc_open_tickets(cfg: AppConfig, conn: sqlite3.Connection) -> int:
     cur = conn.cursor()
+    now = datetime.utcnow()
+    # Whole calendar days since the last status change, computed by SQLite.
     cur.execute(
         """
-        SELECT id, status, last_status_utc, days_without_update, first_received_utc, first_reply_utc, priority
+        SELECT id, status, first_received_utc, first_reply_utc, priority,
+               CAST(julianday(?) - julianday(date(last_status_utc)) AS INTEGER)
+                   AS days_raw
         FROM tickets
-        WHERE status NOT IN (?, ?, ?, ?)
+        WHERE status NOT IN (?, ?, ?, ?, ?)
         """,
-        (STATUS_RESOLVED, STATUS_NOT_INTERESTING, STATUS_TABLE, STATUS_IN_TABLE),
+        (
+            now.date().isoformat(),
+            STATUS_RESOLVED,
+            STATUS_NOT_INTERESTING,
+            STATUS_TABLE,
+            STATUS_IN_TABLE,
+            STATUS_WAITING_CUSTOMER,
+        ),
     )
     rows = cur.fetchall()
-    updated = 0
-    now = datetime.utcnow()
-    holidays = {h for h in cfg.holidays}
-    for r in rows:
+    now_iso = now.isoformat()
+    waiting: List[Tuple[int, int]] = []
+    updates: List[Tuple[int, int, str, str, int]] = []
+    holidays = frozenset(cfg.holidays)
+    bh_args = (cfg.business_hours_start, cfg.business_hours_end, holidays)
+    received = [r["first_received_utc"] for r in rows]
+    try:
+        bus_hours = business_hours_since(received, now, *bh_args)
+    except ValueError:
+        # Timestamps numpy cannot parse: fall back to one call per ticket.
+        bus_hours = [
+            business_hours_between(datetime.fromisoformat(ts), now, *bh_args)
+            for ts in received
+        ]
+    default_hours = float(cfg.overdue_days * 24)
+    thresholds: Dict[str, Tuple[float, float]] = {}
+    for r, bus_hours_since_recv in zip(rows, bus_hours):
         current_status = normalize_status_code(r["status"]) or r["status"]
-        last_status = datetime.fromisoformat(r["last_status_utc"])
-        days = max(0, (now.date() - last_status.date()).days)
+        days = max(0, r["days_raw"])
         priority = r["priority"] or "p3"
-        sla_cfg = cfg.sla_by_priority.get(priority, cfg.sla_by_priority.get("p3", {}))
-        fhours = float(sla_cfg.get("first_response_hours", cfg.overdue_days * 24))
-        rhours = float(sla_cfg.get("resolution_hours", cfg.overdue_days * 24))
-
-        recvd = datetime.fromisoformat(r["first_received_utc"])
-        bus_hours_since_recv = business_hours_between(
-            recvd,
-            now,
-            cfg.business_hours_start,
-            cfg.business_hours_end,
-            holidays=holidays,
-        )
+        limits = thresholds.get(priority)
+        if limits is None:
+            sla_cfg = cfg.sla_by_priority.get(
+                priority, cfg.sla_by_priority.get("p3", {})
+            )
+            limits = thresholds[priority] = (
+                float(sla_cfg.get("first_response_hours", default_hours)),
+                float(sla_cfg.get("resolution_hours", default_hours)),
+            )
+        fhours, rhours = limits
         first_reply = r["first_reply_utc"]
-        first_reply_dt = datetime.fromisoformat(first_reply) if first_reply else None
 
         if current_status == STATUS_WAITING_CUSTOMER:
-            conn.execute(
-                "UPDATE tickets SET days_without_update=?, overdue=0 WHERE id=?",
-                (days, r["id"]),
-            )
-            updated += 1
+            waiting.append((days, r["id"]))
             continue
 
         overdue = False
-        if not first_reply_dt and bus_hours_since_recv >= fhours:
+        if not first_reply and bus_hours_since_recv >= fhours:
             overdue = True
         elif bus_hours_since_recv >= rhours:
             overdue = True
@@ -388,18 +516,15 @@ def recalc_open(cfg: AppConfig) -> int:
         ):
             status = STATUS_OVERDUE
 
-        conn.execute(
-            "UPDATE tickets SET days_without_update=?, overdue=?, status=?, last_status_utc=? WHERE id=?",
-            (days, int(overdue), status, now.isoformat(), r["id"]),
-        )
-        updated += 1
-    conn.commit()
-    conn.close()
-    try:
-        recommend.update_recommendations(cfg)
-    except Exception as exc:
-        log.warning("Recommendations refresh failed: %s", exc)
-    return updated
+        updates.append((days, int(overdue), status, now_iso, r["id"]))
+    with db.write_transaction(conn):
+        waiting_all = conn.execute(
+            _SQL_RECALC_WAITING_ALL,
+            (now.date().isoformat(), STATUS_WAITING_CUSTOMER),
+        ).rowcount
+        conn.executemany(_SQL_RECALC_WAITING, waiting)
+        conn.executemany(_SQL_RECALC_TICKET, updates)
+    return waiting_all + len(waiting) + len(updates)
 
 
 def map_status_text(text: str) -> Optional[str]:
@@ -445,14 +570,14 @@ def _find_ticket_for_message(
 ) -> Optional[sqlite3.Row]:
     if conv_id:
         cur.execute(
-            "SELECT * FROM tickets WHERE conv_id=? ORDER BY datetime(first_received_utc) DESC LIMIT 1",
+            "SELECT * FROM tickets WHERE conv_id=? ORDER BY first_received_utc DESC LIMIT 1",
             (conv_id,),
         )
         row = cur.fetchone()
         if row:
             return row
     cur.execute(
-        "SELECT * FROM tickets WHERE thread_key=? ORDER BY datetime(first_received_utc) DESC LIMIT 1",
+        "SELECT * FROM tickets WHERE thread_key=? ORDER BY first_received_utc DESC LIMIT 1",
         (norm_subj,),
     )
     return cur.fetchone()
@@ -477,130 +602,131 @@ def _send_confirmation(
         log.warning("Failed to send confirmation: %s", exc)
 
 
+@lru_cache(maxsize=8)
+def _quiet_mask(start: int, end: int) -> int:
+    """24-bit mask of quiet hours; a window with start >= end wraps midnight."""
+    if start < end:
+        hours = (h for h in range(24) if start <= h < end)
+    else:
+        hours = (h for h in range(24) if h >= start or h < end)
+    return sum(1 << h for h in hours)
+
+
 def is_quiet_hours(cfg: AppConfig, now: Optional[datetime] = None) -> bool:
     now = now or datetime.now()
-    start = cfg.quiet_hours_start
-    end = cfg.quiet_hours_end
-    hour = now.hour
-    if start < end:
-        return start <= hour < end
-    return hour >= start or hour < end
+    mask = _quiet_mask(cfg.quiet_hours_start, cfg.quiet_hours_end)
+    return bool((mask >> now.hour) & 1)
 
 
 def process_responses(cfg: AppConfig, days: int = 7, outlook_factory=None) -> int:
     """Обработать ответы: VotingResponse или команды /status /prio /owner /comment."""
-    db.ensure_schema(cfg)
     updated = 0
     factory = outlook_factory or OutlookClient
     with factory(cfg) as outlook:
         start = datetime.now() - timedelta(days=days)
-        conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-        cur = conn.cursor()
-        for msg in outlook.iter_messages(start):
-            if safe_get(msg, "Class", 0) != 43:
-                continue
-            subj = safe_get(msg, "Subject", "") or ""
-            body = safe_get(msg, "Body", "") or ""
-            vr = safe_get(msg, "VotingResponse", "") or ""
-            conv_id = safe_get(msg, "ConversationID")
-            entry_id = safe_get(msg, "EntryID")
-            norm_subj = normalize_subject(subj).lower()
-            commands = _parse_command_block(body)
-
-            status = map_voting_response(vr)
-            if not status and "status" in commands:
-                status = map_status_text(commands.get("status"))
-            if not status:
-                m = re.search(
-                    r"(status|\u0441\u0442\u0430\u0442\u0443\u0441)\s*[:=]\s*([\w\s-]+)",
-                    subj + "\\n" + body,
-                    re.IGNORECASE,
+        with db_pool.get_conn(cfg) as conn:
+            cur = conn.cursor()
+            for msg in outlook.iter_messages(start):
+                if safe_get(msg, "Class", 0) != 43:
+                    continue
+                subj = safe_get(msg, "Subject", "") or ""
+                body = safe_get(msg, "Body", "") or ""
+                vr = safe_get(msg, "VotingResponse", "") or ""
+                conv_id = safe_get(msg, "ConversationID")
+                entry_id = safe_get(msg, "EntryID")
+                norm_subj = normalize_subject(subj).lower()
+                commands = _parse_command_block(body)
+
+                status = map_voting_response(vr)
+                if not status and "status" in commands:
+                    status = map_status_text(commands.get("status"))
+                if not status:
+                    m = _STATUS_KV_RE.search(subj + "\\n" + body)
+                    if m:
+                        status = map_status_text(m.group(2))
+
+                priority = commands.get("prio") or commands.get("priority")
+                owner = commands.get("owner") or commands.get("responsible")
+                comment = commands.get("comment")
+
+                row = _find_ticket_for_message(cur, conv_id, norm_subj)
+                if not row:
+                    continue
+
+                updates: Dict[str, str] = {}
+                if status:
+                    updates["status"] = status
+                if owner:
+                    updates["responsible"] = owner
+                if priority:
+                    updates["priority"] = priority
+
+                if not updates:
+                    continue
+
+                set_parts = []
+                params = []
+                touch_ts = False
+                if "status" in updates:
+                    set_parts.append("status=?")
+                    params.append(updates["status"])
+                    set_parts.append("days_without_update=0")
+                    set_parts.append(f"flags = flags & ~{db.FLAG_OVERDUE}")
+                    touch_ts = True
+                if "responsible" in updates:
+                    set_parts.append("responsible=?")
+                    params.append(updates["responsible"])
+                    touch_ts = True
+                if "priority" in updates:
+                    set_parts.append("priority=?")
+                    params.append(updates["priority"])
+                    touch_ts = True
+                if touch_ts:
+                    set_parts.append("last_status_utc=datetime('now')")
+                set_parts.append("row_version=row_version+1")
+                params.append(row["id"])
+                cur.execute(
+                    f"UPDATE tickets SET {', '.join(set_parts)} WHERE id=?", params
                 )
-                if m:
-                    status = map_status_text(m.group(2))
-
-            priority = commands.get("prio") or commands.get("priority")
-            owner = commands.get("owner") or commands.get("responsible")
-            comment = commands.get("comment")
-
-            row = _find_ticket_for_message(cur, conv_id, norm_subj)
-            if not row:
-                continue
-
-            updates: Dict[str, str] = {}
-            if status:
-                updates["status"] = status
-            if owner:
-                updates["responsible"] = owner
-            if priority:
-                updates["priority"] = priority
-
-            if not updates:
-                continue
-
-            set_parts = []
-            params = []
-            touch_ts = False
-            if "status" in updates:
-                set_parts.append("status=?")
-                params.append(updates["status"])
-                set_parts.append("days_without_update=0")
-                set_parts.append("overdue=0")
-                touch_ts = True
-            if "responsible" in updates:
-                set_parts.append("responsible=?")
-                params.append(updates["responsible"])
-                touch_ts = True
-            if "priority" in updates:
-                set_parts.append("priority=?")
-                params.append(updates["priority"])
-                touch_ts = True
-            if touch_ts:
-                set_parts.append("last_status_utc=datetime('now')")
-            set_parts.append("row_version=row_version+1")
-            params.append(row["id"])
-            cur.execute(f"UPDATE tickets SET {', '.join(set_parts)} WHERE id=?", params)
-
-            db.log_event(
-                conn,
-                row["id"],
-                "mail_response",
-                row["status"],
-                updates.get("status", row["status"]),
-                "mail",
-                raw_response=vr or subj,
-                item_entry_id=entry_id,
-            )
-            if comment:
+
                 db.log_event(
                     conn,
                     row["id"],
-                    "comment",
+                    "mail_response",
                     row["status"],
                     updates.get("status", row["status"]),
                     "mail",
-                    raw_response=comment,
+                    raw_response=vr or subj,
                     item_entry_id=entry_id,
                 )
-            _send_confirmation(outlook, msg, cfg, updates)
-            updated += 1
-        conn.commit()
-        conn.close()
+                if comment:
+                    db.log_event(
+                        conn,
+                        row["id"],
+                        "comment",
+                        row["status"],
+                        updates.get("status", row["status"]),
+                        "mail",
+                        raw_response=comment,
+                        item_entry_id=entry_id,
+                    )
+                # Persist before confirming so a later failure can't drop an
+                # update the sender was already told about.
+                conn.commit()
+                _send_confirmation(outlook, msg, cfg, updates)
+                updated += 1
     return updated
 
 
 def overdue_plan(cfg: AppConfig) -> Dict[str, List[dict]]:
-    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT * FROM tickets
-        WHERE status IN (?, ?)
-        """,
-        (STATUS_OVERDUE, STATUS_RESPONDED),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with db_pool.get_conn(cfg) as conn:
+        rows = conn.execute(
+            """
+            SELECT * FROM tickets
+            WHERE status IN (?, ?)
+            """,
+            (STATUS_OVERDUE, STATUS_RESPONDED),
+        ).fetchall()
     plan: Dict[str, List[dict]] = {
         "send": [],
         "skip_interval": [],
@@ -639,13 +765,11 @@ def overdue_candidates(cfg: AppConfig) -> List[dict]:
 
 
 def mark_reminder_sent(cfg: AppConfig, ticket_id: int) -> None:
-    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-    conn.execute(
-        "UPDATE tickets SET last_reminder_utc=datetime('now'), row_version=row_version+1 WHERE id=?",
-        (ticket_id,),
-    )
-    conn.commit()
-    conn.close()
+    with db_pool.get_conn(cfg) as conn:
+        conn.execute(
+            "UPDATE tickets SET last_reminder_utc=datetime('now'), row_version=row_version+1 WHERE id=?",
+            (ticket_id,),
+        )
 
 
 def _build_sent_index(
@@ -664,9 +788,10 @@ def _build_sent_index(
     item = getter_first() if getter_first else None
     while item:
         cls = safe_get(item, "Class", 0)
-        if cls == 43:
+        sent_on = _to_naive(safe_get(item, "SentOn")) if cls == 43 else None
+        # Items without a usable SentOn can never be "first after" a message.
+        if sent_on:
             subject = safe_get(item, "Subject", "") or ""
-            sent_on = _to_naive(safe_get(item, "SentOn"))
             conv_id = safe_get(item, "ConversationID")
             norm_subj = normalize_subject(subject)
             key = (conv_id or norm_subj).lower()
@@ -681,19 +806,21 @@ def _build_sent_index(
         getter_next = safe_get(restricted, "GetNext")
         item = getter_next() if getter_next else None
     for rec in idx.values():
-        rec["replies"].sort(key=lambda x: x[0])
-        rec["forwards"].sort(key=lambda x: x[0])
+        rec["replies"].sort(key=_event_time)
+        rec["forwards"].sort(key=_event_time)
     return idx
 
 
 def _find_first_after(
     events: List[Tuple[datetime, str]], after_dt: datetime
 ) -> Tuple[Optional[datetime], Optional[str]]:
+    """First (sent_on, payload) at or after after_dt in a sorted event list."""
     after = _to_naive(after_dt)
-    for dt, payload in events:
-        ndt = _to_naive(dt)
-        if ndt and after and ndt >= after:
-            return ndt, payload
+    if not after:
+        return None, None
+    i = bisect_left(events, after, key=_event_time)
+    if i < len(events):
+        return events[i]
     return None, None
 
 
@@ -103,7 +103,8 @@ def main():
     excel_path = excel.export_excel(cfg, today_only=False)
     conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
     row_after = conn.execute(
-        "SELECT status, overdue, row_version FROM tickets WHERE id=?", (ticket_id,)
+        "SELECT status, overdue, row_version FROM tickets_view WHERE id=?",
+        (ticket_id,),
     ).fetchone()
     conn.close()
     print(
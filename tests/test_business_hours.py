@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from core.sla import business_hours_between
+from core.sla import business_hours_between, business_hours_since
 
 
 def dt(day, hour):
@@ -24,3 +24,19 @@ def test_business_hours_holiday():
 def test_business_hours_cross_midnight():
     # From 18:00 to next day 11:00 with 9-18 hours => only 2 hours (next day 9-11)
     assert business_hours_between(dt(1, 18), dt(2, 11), start_hour=9, end_hour=18) == 2
+
+
+def test_business_hours_multi_week_with_holidays():
+    # Jan 1 16:00 -> Jan 15 12:00, 9-18: 2h + 9 full weekdays (two are
+    # holidays, one malformed entry ignored) * 9h + 3h on Jan 15.
+    h = ["2024-01-03", "2024-01-10", "2024-1-11"]
+    got = business_hours_between(dt(1, 16), dt(15, 12), 9, 18, holidays=h)
+    assert got == 2 + 7 * 9 + 3
+
+
+def test_business_hours_since_matches_scalar():
+    now = datetime(2024, 1, 15, 13, 30, 0)
+    received = [dt(1, 16), dt(12, 8), dt(13, 12), dt(15, 9), dt(15, 14), dt(16, 9)]
+    h = ["2024-01-03", "2024-01-10"]
+    got = business_hours_since([r.isoformat() for r in received], now, 9, 18, h)
+    assert got == [business_hours_between(r, now, 9, 18, h) for r in received]
@@ -0,0 +1,142 @@
+import tempfile
+import types
+from pathlib import Path
+
+import config
+from config import AppConfig, Paths
+
+
+def _cfg():
+    tmp = tempfile.mkdtemp()
+    return AppConfig(
+        paths=Paths(
+            appdata_dir=tmp,
+            log_dir=f"{tmp}/logs",
+            db_path=f"{tmp}/db.sqlite3",
+            excel_path=f"{tmp}/t.xlsx",
+            backup_dir=f"{tmp}/bak",
+        )
+    )
+
+
+def test_load_reuses_parsed_config(monkeypatch):
+    cfg = _cfg()
+    cfg_path = Path(cfg.paths.appdata_dir) / "config.json"
+    cfg.save(cfg_path)
+    parses = []
+    real_loads = config._json_loads
+    monkeypatch.setattr(
+        config, "_json_loads", lambda raw: parses.append(1) or real_loads(raw)
+    )
+    first = AppConfig.load(cfg_path)
+    second = AppConfig.load(cfg_path)
+    assert len(parses) == 1
+    assert first is not second
+    assert first.ingest_days == second.ingest_days
+
+
+def test_mutating_loaded_config_does_not_leak_into_next_load():
+    cfg = _cfg()
+    cfg_path = Path(cfg.paths.appdata_dir) / "config.json"
+    cfg.save(cfg_path)
+    first = AppConfig.load(cfg_path)
+    first.allow_send = True
+    first.safe_mode = False
+    first.sender_filter = ""
+    first.send_allowlist.append("leak@example.com")
+    second = AppConfig.load(cfg_path)
+    assert second.allow_send == cfg.allow_send
+    assert second.safe_mode == cfg.safe_mode
+    assert second.sender_filter == cfg.sender_filter
+    assert "leak@example.com" not in second.send_allowlist
+
+
+def test_save_invalidates_cached_config():
+    cfg = _cfg()
+    cfg_path = Path(cfg.paths.appdata_dir) / "config.json"
+    cfg.save(cfg_path)
+    first = AppConfig.load(cfg_path)
+    first.ingest_days = 11
+    first.save(cfg_path)
+    second = AppConfig.load(cfg_path)
+    assert second is not first
+    assert second.ingest_days == 11
+
+
+def test_load_partial_reads_only_requested_fields():
+    cfg = _cfg()
+    cfg.wal_mode = False
+    cfg.ingest_days = 11
+    cfg_path = Path(cfg.paths.appdata_dir) / "config.json"
+    cfg.save(cfg_path)
+    partial = AppConfig.load_partial(cfg_path, {"paths", "wal_mode"})
+    assert partial.wal_mode is False
+    assert partial.ingest_days == AppConfig().ingest_days
+    assert partial.paths.db_path == Path(cfg.paths.db_path)
+
+
+def test_allowed_recipient_matches_subdomains():
+    cfg = AppConfig()
+    cfg.send_allow_domains = ["ru.naos.com"]
+    cfg.send_allowlist = ["Boss@Example.com"]
+    assert cfg.is_allowed_recipient("user@ru.naos.com")
+    assert cfg.is_allowed_recipient("user@eu.ru.naos.com")
+    assert cfg.is_allowed_recipient("boss@example.com")
+    assert not cfg.is_allowed_recipient("user@naos.com")
+    assert not cfg.is_allowed_recipient("user@ru.naos.com.evil.org")
+    assert not cfg.is_allowed_recipient("ru.naos.com")
+
+
+def test_allowed_recipient_follows_in_place_list_edits():
+    cfg = AppConfig()
+    cfg.send_allow_domains = ["naos.com"]
+    cfg.send_allowlist = []
+    cfg.test_allowlist = []
+    assert not cfg.is_allowed_recipient("x@evil.org")
+    cfg.send_allow_domains.append("evil.org")
+    cfg.test_allowlist.append("QA@Test.org")
+    assert cfg.is_allowed_recipient("x@evil.org")
+    assert cfg.is_allowed_recipient("qa@test.org")
+    cfg.send_allow_domains.remove("naos.com")
+    assert not cfg.is_allowed_recipient("a@naos.com")
+
+
+def test_load_skips_first_run_write_when_autosave_disabled(monkeypatch):
+    monkeypatch.setenv("NAOS_SLA_AUTOSAVE_CONFIG", "0")
+    cfg_path = Path(tempfile.mkdtemp()) / "config.json"
+    AppConfig.load(cfg_path)
+    assert not cfg_path.exists()
+
+
+def test_load_does_not_overwrite_unreadable_config():
+    cfg_path = Path(tempfile.mkdtemp()) / "config.json"
+    cfg_path.write_text("{not json", encoding="utf-8")
+    AppConfig.load(cfg_path)
+    assert cfg_path.read_text(encoding="utf-8") == "{not json"
+
+
+def test_cli_load_cfg_returns_private_copies():
+    import cli
+
+    cfg = _cfg()
+    cfg_path = Path(cfg.paths.appdata_dir) / "config.json"
+    cfg.save(cfg_path)
+    args = types.SimpleNamespace(config=str(cfg_path))
+    first = cli.load_cfg(args)
+    first.allow_send = True
+    first.safe_mode = False
+    second = cli.load_cfg(args)
+    assert (second.allow_send, second.safe_mode) == (cfg.allow_send, cfg.safe_mode)
+
+
+def test_cli_load_cfg_sees_saved_changes():
+    import cli
+
+    cfg = _cfg()
+    cfg_path = Path(cfg.paths.appdata_dir) / "config.json"
+    cfg.save(cfg_path)
+    args = types.SimpleNamespace(config=str(cfg_path))
+    assert cli.load_cfg(args).ingest_days == cfg.ingest_days
+    cfg.ingest_days += 5
+    cfg.save(cfg_path)
+    assert cli.load_cfg(args).ingest_days == cfg.ingest_days
@@ -66,3 +66,40 @@ def test_internal_only_returns_none():
         internal_domains=["ru.naos.com"],
     )
     assert email is None
+
+
+def test_forward_header_preferred_over_earlier_address():
+    body = "См. agent2@ru.naos.com и notes@other.org\nОТ: Client <c@client.ru>"
+    email = extract_customer_email(
+        msg=None,
+        sender_smtp="agent@ru.naos.com",
+        body_text=body,
+        subject="",
+        internal_domains=["ru.naos.com"],
+    )
+    assert email == "c@client.ru"
+
+
+def test_body_getter_skipped_for_external_sender():
+    def boom():
+        raise AssertionError("Body must not be read for external senders")
+
+    email = extract_customer_email(
+        msg=None,
+        sender_smtp="user@example.com",
+        body_text=boom,
+        subject="",
+        internal_domains=["ru.naos.com"],
+    )
+    assert email == "user@example.com"
+
+
+def test_body_getter_used_for_internal_sender():
+    email = extract_customer_email(
+        msg=None,
+        sender_smtp="agent@ru.naos.com",
+        body_text=lambda: "From: client@domain.com\nBody text",
+        subject="",
+        internal_domains=["ru.naos.com"],
+    )
+    assert email == "client@domain.com"
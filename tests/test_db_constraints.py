@@ -85,3 +85,254 @@ def test_event_idempotency():
     ).fetchone()["c"]
     conn.close()
     assert events == 1
+
+
+def test_quick_get_status_reads_committed_status():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status="assigned")
+    assert db.quick_get_status(cfg.paths.db_path, tid) == "assigned"
+    conn.execute("UPDATE tickets SET status='resolved' WHERE id=?", (tid,))
+    conn.commit()
+    conn.close()
+    assert db.quick_get_status(cfg.paths.db_path, tid) == "resolved"
+    assert db.quick_get_status(cfg.paths.db_path, tid + 100) is None
+
+
+def test_upsert_tickets_returns_ids_in_order():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    existing = db.seed_test_ticket(conn, status="new")
+    row = conn.execute("SELECT * FROM tickets_view WHERE id=?", (existing,)).fetchone()
+    now = datetime.utcnow()
+    base = {k: row[k] for k in db.TICKET_COLUMNS[1:]}
+    records = [
+        TicketRecord(id=None, **{**base, "conv_id": f"b{i}", "stable_id": None})
+        for i in range(3)
+    ]
+    records.insert(
+        1,
+        TicketRecord(
+            id=existing, **{**base, "status": "resolved", "last_updated_at": now}
+        ),
+    )
+    ids = db.upsert_tickets(conn, records)
+    assert ids[1] == existing
+    assert len(set(ids)) == 4
+    assert not conn.in_transaction
+    assert db.quick_get_status(cfg.paths.db_path, existing) == "resolved"
+    conn.close()
+
+
+def test_connect_applies_write_pragmas():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=True)
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    conn.close()
+
+
+def test_write_transaction_rolls_back_on_error():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    try:
+        with db.write_transaction(conn):
+            db.seed_test_ticket(conn, status="new")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0] == 0
+    conn.close()
+
+
+def test_upsert_ticket_returns_existing_id_on_update():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status="new")
+    db.seed_test_ticket(conn, status="assigned")
+    row = conn.execute("SELECT * FROM tickets_view WHERE id=?", (tid,)).fetchone()
+    rec = TicketRecord(id=None, **{k: row[k] for k in db.TICKET_COLUMNS[1:]})
+    assert db.upsert_ticket(conn, rec) == tid
+    conn.close()
+
+
+def test_ensure_schema_migrates_legacy_statuses():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    legacy = db.seed_test_ticket(conn, status="in_table")
+    current = db.seed_test_ticket(conn, status="assigned")
+    conn.close()
+    db.ensure_schema(cfg)
+    assert db.quick_get_status(cfg.paths.db_path, legacy) == "table"
+    assert db.quick_get_status(cfg.paths.db_path, current) == "assigned"
+
+
+def test_upsert_packs_booleans_into_flags():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status="overdue")
+    row = conn.execute("SELECT * FROM tickets_view WHERE id=?", (tid,)).fetchone()
+    rec = TicketRecord(
+        id=tid, **{**{k: row[k] for k in db.TICKET_COLUMNS[1:]}, "is_repeat": True}
+    )
+    db.upsert_ticket(conn, rec)
+    flags = conn.execute("SELECT flags FROM tickets WHERE id=?", (tid,)).fetchone()[0]
+    assert flags == db.FLAG_OVERDUE | db.FLAG_IS_REPEAT
+    row = db.fetch_tickets(conn, "id=?", (tid,))[0]
+    assert (row["overdue"], row["not_interesting"], row["is_repeat"]) == (1, 0, 1)
+    conn.close()
+
+
+def test_ensure_schema_folds_legacy_boolean_columns():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status="new")
+    conn.executescript(
+        """
+        DROP VIEW tickets_view;
+        ALTER TABLE tickets DROP COLUMN flags;
+        ALTER TABLE tickets ADD COLUMN overdue INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE tickets ADD COLUMN not_interesting INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE tickets ADD COLUMN is_repeat INTEGER NOT NULL DEFAULT 0;
+        UPDATE tickets SET overdue=1, is_repeat=1;
+        """
+    )
+    conn.close()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    flags = conn.execute("SELECT flags FROM tickets WHERE id=?", (tid,)).fetchone()[0]
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(tickets)")}
+    conn.close()
+    assert flags == db.FLAG_OVERDUE | db.FLAG_IS_REPEAT
+    assert not cols & {"overdue", "not_interesting", "is_repeat"}
+
+
+def test_fetch_tickets_orders_by_received_index():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    db.seed_test_tickets(conn, ["new", "overdue", "assigned"])
+    rows = db.fetch_tickets(conn)
+    received = [r["first_received_utc"] for r in rows]
+    assert received == sorted(received, reverse=True)
+    plan = " ".join(
+        str(r[-1])
+        for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM tickets ORDER BY first_received_utc DESC"
+        )
+    )
+    assert "idx_tickets_first_received" in plan
+    conn.close()
+
+
+def test_fetch_tickets_skips_bodies_by_default():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status="new")
+    row = db.fetch_tickets(conn)[0]
+    assert "body" not in row.keys()
+    assert db.fetch_tickets_full(conn)[0]["body"] == db.get_ticket_body(conn, tid)
+    assert db.fetch_tickets(conn, columns=["id", "status"])[0]["status"] == "new"
+    conn.close()
+
+
+def test_fetch_tickets_raw_rows():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    db.seed_test_tickets(conn, ["new", "assigned"])
+    raw = db.fetch_tickets(conn, columns=["id", "status"], raw=True)
+    assert type(raw[0]) is tuple
+    assert sorted(status for _, status in raw) == ["assigned", "new"]
+    conn.close()
+
+
+def test_log_events_inserts_batch_once_per_entry_id():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status="new")
+    events = [
+        (tid, "mail_response", None, "resolved", "mail", None, "y1"),
+        (tid, "mail_response", None, "resolved", "mail", None, "y1"),
+        (tid, "comment", None, None, "mail", "hi", "y2"),
+    ]
+    db.log_events(conn, events)
+    rows = conn.execute(
+        "SELECT event_dt_utc FROM events WHERE item_entry_id IN ('y1', 'y2')"
+    ).fetchall()
+    assert len(rows) == 2
+    assert len(rows[0]["event_dt_utc"]) == len("2024-01-01 00:00:00")
+    conn.close()
+
+
+def test_iter_tickets_streams_all_rows():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    db.seed_test_tickets(conn, ["new", "assigned", "overdue"])
+    streamed = [r["id"] for r in db.iter_tickets(conn)]
+    assert streamed == [r["id"] for r in db.fetch_tickets(conn)]
+    conn.close()
+
+
+def test_bulk_upsert_tickets_matches_upsert_tickets():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    existing = db.seed_test_ticket(conn, status="new")
+    row = conn.execute("SELECT * FROM tickets_view WHERE id=?", (existing,)).fetchone()
+    base = {k: row[k] for k in db.TICKET_COLUMNS[1:]}
+    records = [
+        TicketRecord(id=None, **{**base, "conv_id": f"s{i}", "stable_id": None})
+        for i in range(3)
+    ]
+    records.append(TicketRecord(id=None, **{**base, "status": "resolved"}))
+    ids = db.bulk_upsert_tickets(conn, records)
+    assert ids[-1] == existing
+    assert len(set(ids)) == 4
+    assert db.quick_get_status(cfg.paths.db_path, existing) == "resolved"
+    assert db.bulk_upsert_tickets(conn, records) == ids
+    conn.close()
+
+
+def test_bulk_upsert_tickets_writes_same_rows_as_upsert_tickets():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    existing = db.seed_test_ticket(conn, status="new")
+    row = conn.execute("SELECT * FROM tickets_view WHERE id=?", (existing,)).fetchone()
+    base = {k: row[k] for k in db.TICKET_COLUMNS[1:]}
+    conn.close()
+    results = []
+    for upsert in (db.upsert_tickets, db.bulk_upsert_tickets):
+        cfg = _cfg()
+        db.ensure_schema(cfg)
+        conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+        db.upsert_tickets(conn, [TicketRecord(id=None, **base)])
+        records = [
+            TicketRecord(id=None, **{**base, "conv_id": f"s{i}", "stable_id": None})
+            for i in range(3)
+        ]
+        records.append(TicketRecord(id=None, **{**base, "status": "resolved"}))
+        records.append(
+            TicketRecord(
+                id=None,
+                **{**base, "conv_id": "s1", "stable_id": None, "comment": "again"},
+            )
+        )
+        ids = upsert(conn, records)
+        rows = [tuple(r) for r in conn.execute("SELECT * FROM tickets ORDER BY id")]
+        results.append((ids, rows))
+        conn.close()
+    assert results[0] == results[1]
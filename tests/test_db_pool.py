@@ -0,0 +1,41 @@
+import tempfile
+
+from config import AppConfig, Paths
+from core import db, db_pool
+
+
+def _cfg():
+    tmp = tempfile.mkdtemp()
+    return AppConfig(
+        paths=Paths(
+            appdata_dir=tmp,
+            log_dir=f"{tmp}/logs",
+            db_path=f"{tmp}/db.sqlite3",
+            excel_path=f"{tmp}/t.xlsx",
+            backup_dir=f"{tmp}/bak",
+        )
+    )
+
+
+def test_get_conn_reuses_connection_and_commits():
+    cfg = _cfg()
+    with db_pool.get_conn(cfg) as conn:
+        tid = db.seed_test_ticket(conn, status="new")
+    with db_pool.get_conn(cfg) as again:
+        assert again is conn
+    assert db.quick_get_status(cfg.paths.db_path, tid) == "new"
+    db_pool.close_all()
+
+
+def test_get_conn_rolls_back_on_error():
+    cfg = _cfg()
+    with db_pool.get_conn(cfg) as conn:
+        tid = db.seed_test_ticket(conn, status="new")
+    try:
+        with db_pool.get_conn(cfg) as conn:
+            conn.execute("UPDATE tickets SET status='resolved' WHERE id=?", (tid,))
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert db.quick_get_status(cfg.paths.db_path, tid) == "new"
+    db_pool.close_all()
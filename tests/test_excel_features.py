@@ -2,6 +2,7 @@ import tempfile
 from pathlib import Path
 
 import pandas as pd
+from openpyxl import load_workbook
 
 from config import AppConfig, Paths
 from core import db, excel, sla
@@ -80,3 +81,108 @@ def test_sync_from_excel_conflict_row_version():
         df.to_excel(writer, sheet_name=excel.SHEET_TICKETS, index=False)
     res = excel.sync_from_excel(cfg)
     assert res["conflicts"] >= 1
+
+
+def test_sync_from_excel_blank_cells_do_not_store_nan():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid = db.seed_test_ticket(conn, status=sla.STATUS_NEW)
+    conn.close()
+    path = excel.export_excel(cfg, today_only=False)
+    df = pd.read_excel(path, sheet_name=excel.SHEET_TICKETS)
+    df[STATUS_COL] = df[STATUS_COL].astype(object)
+    df.loc[df["ticket_id"] == tid, STATUS_COL] = None
+    with pd.ExcelWriter(
+        path, engine="openpyxl", mode="a", if_sheet_exists="replace"
+    ) as writer:
+        df.to_excel(writer, sheet_name=excel.SHEET_TICKETS, index=False)
+    res = excel.sync_from_excel(cfg)
+    assert res["updated"] == 1
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    row = conn.execute(
+        "SELECT status, responsible, comment FROM tickets WHERE id=?", (tid,)
+    ).fetchone()
+    conn.close()
+    assert row["status"] == sla.STATUS_NEW
+    assert row["responsible"] is None
+    assert row["comment"] is None
+
+
+def test_export_styles_rows_with_unknown_status():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    _, tid = db.seed_test_tickets(conn, [sla.STATUS_NEW, sla.STATUS_ASSIGNED])
+    conn.execute("UPDATE tickets SET status='mystery' WHERE id=?", (tid,))
+    conn.commit()
+    conn.close()
+    path = excel.export_excel(cfg, today_only=False)
+
+    ws = load_workbook(path)[excel.SHEET_TICKETS]
+    headers = [c.value for c in ws[1]]
+    status_col = headers.index(STATUS_COL) + 1
+    fills = {
+        ws.cell(row=r, column=status_col).value: ws.cell(row=r, column=1).fill
+        for r in range(2, ws.max_row + 1)
+    }
+    assert fills["mystery"].fill_type is None
+    assert fills[excel.status_code_to_label(sla.STATUS_NEW)].fgColor.rgb.endswith(
+        "FFF2CC"
+    )
+    assert ws.cell(row=2, column=1).protection.locked
+    assert not ws.cell(row=2, column=status_col).protection.locked
+
+
+def test_export_excel_async_writes_workbook_in_worker():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    db.seed_test_ticket(conn, status=sla.STATUS_NEW)
+    conn.close()
+    try:
+        path = excel.export_excel_async(cfg).result(timeout=120)
+    finally:
+        excel.shutdown_export_executor()
+    assert Path(path) == Path(cfg.paths.excel_path)
+    df = pd.read_excel(path, sheet_name=excel.SHEET_TICKETS)
+    assert len(df) == 1
+
+
+def test_atomic_replace_keeps_previous_file_as_backup():
+    cfg = _cfg()
+    target = Path(cfg.paths.excel_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text("old", encoding="utf-8")
+    target.with_suffix(".bak").write_text("older", encoding="utf-8")
+    tmp = target.with_name("tmp.xlsx")
+    tmp.write_text("new", encoding="utf-8")
+
+    assert excel._atomic_replace(tmp, target) == target
+    assert target.read_text(encoding="utf-8") == "new"
+    assert target.with_suffix(".bak").read_text(encoding="utf-8") == "old"
+
+
+def test_fast_xlsx_export_matches_openpyxl_export():
+    cfg = _cfg()
+    db.ensure_schema(cfg)
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    tid, *_ = db.seed_test_tickets(
+        conn, [sla.STATUS_NEW, sla.STATUS_OVERDUE, sla.STATUS_RESOLVED]
+    )
+    conn.execute("UPDATE tickets SET subject=? WHERE id=?", (" <a & b> ", tid))
+    conn.commit()
+    conn.close()
+    slow = pd.read_excel(excel.export_excel(cfg), sheet_name=None)
+    cfg.fast_xlsx = True
+    cfg.fast_xlsx_min_rows = 0
+    path = excel.export_excel(cfg)
+    fast = pd.read_excel(path, sheet_name=None)
+
+    assert list(fast) == list(slow)
+    for name in slow:
+        pd.testing.assert_frame_equal(fast[name], slow[name])
+    ws = load_workbook(path)[excel.SHEET_TICKETS]
+    assert ws.protection.sheet and ws.freeze_panes == "A2"
+    assert len(ws.data_validations.dataValidation) == 2
+    assert excel.sync_from_excel(cfg)["conflicts"] == 0
@@ -0,0 +1,29 @@
+from config import AppConfig
+from core import notify
+
+
+def test_overdue_html_escapes_subject_and_links():
+    cfg = AppConfig()
+    cfg.docs_url = 'https://wiki/?a=1&b="x"'
+    html = notify._build_overdue_html(
+        cfg, "<script>alert(1)</script>", 42, "p1", "C:/t&s.xlsx"
+    )
+    assert "<script>" not in html
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in html
+    assert "Просрочка SLA #42 — P1" in html
+    assert 'href="https://wiki/?a=1&amp;b=&quot;x&quot;"' in html
+    assert "Excel: C:/t&amp;s.xlsx" in html
+    assert "<code>/status</code>" in html
+
+
+def test_filter_recipients_uses_allowlists_and_subdomains():
+    cfg = AppConfig()
+    cfg.send_allow_domains = ["Naos.com"]
+    cfg.send_allowlist = ["Boss@Example.com"]
+    cfg.test_allowlist = ["qa@test.org"]
+    allowed, blocked = notify._filter_recipients(
+        cfg,
+        [" Agent@ru.naos.com", "boss@example.com", "QA@test.org", "x@evil.org", ""],
+    )
+    assert allowed == ["agent@ru.naos.com", "boss@example.com", "qa@test.org"]
+    assert blocked == ["x@evil.org"]
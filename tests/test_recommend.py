@@ -0,0 +1,54 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import recommend
+
+sparse = pytest.importorskip("scipy.sparse")
+
+
+def test_repeat_matches_excludes_self_and_counts_threshold(monkeypatch):
+    monkeypatch.setattr(recommend, "SIMILARITY_BLOCK", 2)
+    matrix = sparse.csr_matrix(
+        np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [0.0, 0.0]])
+    )
+    counts, best = recommend._repeat_matches(matrix, 0.5)
+    assert counts.tolist() == [2, 2, 1, 3, 0]
+    assert best.tolist() == [1, 0, 3, 0, 0]
+
+
+def test_top_k_matches_stable_descending_sort():
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.5, 0.1])
+    assert recommend._top_k(scores, 3).tolist() == [1, 3, 2]
+    assert recommend._top_k(scores, 10).tolist() == [1, 3, 2, 4, 0, 5]
+    assert recommend._top_k(scores, 0).tolist() == []
+
+
+def test_load_qa_pairs_skips_blank_cells():
+    path = Path(tempfile.mkdtemp()) / "orm.xlsx"
+    pd.DataFrame(
+        {"Вопрос": [" Сброс пароля ", None, "Доставка"], "Ответ": ["Шаги", "x", None]}
+    ).to_excel(path, index=False)
+    rules = recommend.load_qa_pairs(path)
+    assert rules == [recommend.RecommendationRule("Сброс пароля", "Шаги")]
+
+
+def test_ticket_matrix_reuses_cache_until_texts_change(monkeypatch):
+    cache = Path(tempfile.mkdtemp()) / recommend.TFIDF_CACHE_NAME
+    texts = ["reset password", "delivery status", "reset password please"]
+    first = recommend._ticket_matrix(texts, cache)
+    assert cache.exists()
+
+    def no_fit(**kwargs):
+        raise AssertionError("cached matrix should be reused")
+
+    monkeypatch.setattr(recommend, "_safe_vectorizer", no_fit)
+    again = recommend._ticket_matrix(texts, cache)
+    assert (again != first).nnz == 0
+
+    monkeypatch.undo()
+    changed = recommend._ticket_matrix(texts + ["refund"], cache)
+    assert changed.shape[0] == 4
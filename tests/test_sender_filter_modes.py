@@ -1,5 +1,5 @@
 from config import AppConfig
-from core.utils import passes_sender_filter
+from core.utils import passes_sender_filter, sender_filter
 
 
 def test_sender_filter_off():
@@ -30,3 +30,13 @@ def test_sender_filter_domain():
     cfg.sender_filter_value = "naos.com"
     assert passes_sender_filter("user@sub.naos.com", cfg) is True
     assert passes_sender_filter("user@example.com", cfg) is False
+
+
+def test_sender_filter_predicate_normalises_config_once():
+    cfg = AppConfig()
+    cfg.sender_filter_mode = " Domain "
+    cfg.sender_filter_value = "@NAOS.com"
+    passes = sender_filter(cfg)
+    cfg.sender_filter_value = "other.com"
+    assert passes("user@naos.com") is True
+    assert passes(None) is False
@@ -72,13 +72,16 @@ def test_recalc_marks_overdue():
     updated = sla.recalc_open(cfg)
     assert updated >= 1
     conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
-    row = conn.execute("SELECT status FROM tickets WHERE thread_key='t1'").fetchone()
+    row = conn.execute(
+        "SELECT status, overdue FROM tickets_view WHERE thread_key='t1'"
+    ).fetchone()
     conn.close()
     assert row["status"] in (
         sla.STATUS_OVERDUE,
         sla.STATUS_RESPONDED,
         sla.STATUS_ASSIGNED,
     )
+    assert row["overdue"] == 1
 
 
 def test_parse_command_block_stops_before_quote():
@@ -153,3 +156,15 @@ def test_priority_sla_overdue_by_hours():
     row = conn.execute("SELECT status FROM tickets WHERE thread_key='t2'").fetchone()
     conn.close()
     assert row["status"] == sla.STATUS_OVERDUE
+
+
+def test_find_first_after_returns_earliest_at_or_after():
+    events = [
+        (datetime(2024, 1, 2, 9), "a"),
+        (datetime(2024, 1, 2, 12), "b"),
+        (datetime(2024, 1, 2, 12), "c"),
+    ]
+    assert sla._find_first_after(events, datetime(2024, 1, 2, 10)) == events[1]
+    assert sla._find_first_after(events, datetime(2024, 1, 2, 9)) == events[0]
+    assert sla._find_first_after(events, datetime(2024, 1, 3)) == (None, None)
+    assert sla._find_first_after([], datetime(2024, 1, 3)) == (None, None)
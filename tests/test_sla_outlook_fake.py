@@ -38,6 +38,38 @@ def test_ingest_range_with_fake_outlook():
     assert row["subject"] == "Test subject"
 
 
+def test_ingest_range_merges_full_batches(monkeypatch):
+    cfg = _cfg()
+    monkeypatch.setattr(db, "UPSERT_BATCH_SIZE", 2)
+    bulk_calls = []
+    bulk_upsert = db.bulk_upsert_tickets
+    monkeypatch.setattr(
+        db,
+        "bulk_upsert_tickets",
+        lambda conn, tickets: bulk_calls.append(len(tickets))
+        or bulk_upsert(conn, tickets),
+    )
+    msgs = [
+        FakeMail(
+            Subject=f"Subject {i}",
+            Body="Body text",
+            ReceivedTime=datetime.now(),
+            EntryID=f"entry{i}",
+            ConversationID=f"conv{i}",
+            SenderEmailAddress="user@example.com",
+        )
+        for i in range(5)
+    ]
+    client = FakeOutlookClient(msgs)
+    processed = sla.ingest_range(cfg, days=1, outlook_factory=lambda c: client)
+    assert processed == 5
+    assert bulk_calls == [2, 2]
+    conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
+    count = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    conn.close()
+    assert count == 5
+
+
 def test_process_responses_fake_vote():
     cfg = _cfg()
     db.ensure_schema(cfg)
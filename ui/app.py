@@ -728,7 +728,7 @@ class MainWindow(QtWidgets.QMainWindow):
             conn = db.connect(self.cfg.paths.db_path, wal_mode=self.cfg.wal_mode)
             total = conn.execute("SELECT count(*) FROM tickets").fetchone()[0]
             overdue = conn.execute(
-                "SELECT count(*) FROM tickets WHERE overdue=1"
+                f"SELECT count(*) FROM tickets WHERE flags & {db.FLAG_OVERDUE}"
             ).fetchone()[0]
             need = conn.execute(
                 "SELECT count(*) FROM tickets WHERE status IN ('new','assigned','table','otip','waiting_customer')"
@@ -770,13 +770,13 @@ class MainWindow(QtWidgets.QMainWindow):
                 where.append("(responsible IS NULL OR responsible='')")
             base_sql = """
             SELECT t.*, EXISTS(SELECT 1 FROM events e WHERE e.ticket_id=t.id AND e.event_type='excel_conflict') AS has_conflict
-            FROM tickets t
+            FROM tickets_view t
             """
             if filter_key == "conflict":
                 base_sql += " WHERE EXISTS(SELECT 1 FROM events e WHERE e.ticket_id=t.id AND e.event_type='excel_conflict')"
             elif where:
                 base_sql += " WHERE " + " AND ".join(where)
-            base_sql += " ORDER BY datetime(first_received_utc) DESC LIMIT 500"
+            base_sql += " ORDER BY first_received_utc DESC LIMIT 500"
             rows = conn.execute(base_sql, params).fetchall()
             self._current_rows: Dict[int, dict] = {}
             for r in rows:
@@ -888,10 +888,10 @@ class MainWindow(QtWidgets.QMainWindow):
         try:
             conn = db.connect(cfg.paths.db_path, wal_mode=cfg.wal_mode)
             conn.execute(
-                """
+                f"""
                 UPDATE tickets
                 SET status=?, responsible=?, priority=?, comment=?, days_without_update=0,
-                    overdue=CASE WHEN ? IN ('resolved','table','not_interesting') THEN 0 ELSE overdue END,
+                    flags=CASE WHEN ? IN ('resolved','table','not_interesting') THEN flags & ~{db.FLAG_OVERDUE} ELSE flags END,
                     last_status_utc=datetime('now'), last_updated_at=datetime('now'), last_updated_by='ui', row_version=row_version+1, data_source='ui'
                 WHERE id=?
                 """,